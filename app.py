@@ -1,53 +1,519 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
 import time
+_import_started = time.monotonic()
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, g
 import threading
+import signal
+import argparse
+import sys
 import datetime
 import json
 import os
 import subprocess
 import socket
-import paramiko
+import selectors
+import struct
+import errno
+import random
+import math
+import atexit
+import uuid
+import heapq
+import re
+import collections
+import ipaddress
+import concurrent.futures
+import importlib
+try:
+    import fcntl
+except ImportError:  # Windows: no interface ioctls, fall back to /24 guess
+    fcntl = None
 import logging
 from logging.handlers import RotatingFileHandler
 import csv
-import urllib.request
+import queue
+import sqlite3
+import urllib.parse
+import http.client
 
 app = Flask(__name__)
 
+class _LazyModule:
+    """Stand-in for a heavy module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+# paramiko pulls in cryptography, nacl and bcrypt; only load it for SSH
+paramiko = _LazyModule('paramiko')
+
 # Setup logging
 log_dir = 'logs'
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
 
 # System log for debugging and errors
-system_log_handler = RotatingFileHandler(
-    os.path.join(log_dir, 'system.log'),
-    maxBytes=1024 * 1024 * 5,  # 5 MB
-    backupCount=5
-)
-system_log_handler.setFormatter(logging.Formatter(
-    '%(asctime)s - %(levelname)s - %(message)s'
-))
-
 system_logger = logging.getLogger('system_logger')
 system_logger.setLevel(logging.INFO)
-system_logger.addHandler(system_log_handler)
 
-# Activity log for user actions and device status changes
-def log_activity(action, result, details=None):
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_file = os.path.join(log_dir, 'activity.csv')
+def _setup_logging():
+    """Create the log directory and attach the rotating system.log handler."""
+    os.makedirs(log_dir, exist_ok=True)
+    if system_logger.handlers:
+        return
+    system_log_handler = RotatingFileHandler(
+        os.path.join(log_dir, 'system.log'),
+        maxBytes=1024 * 1024 * 5,  # 5 MB
+        backupCount=5
+    )
+    system_log_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(levelname)s - %(message)s'
+    ))
+    system_logger.addHandler(system_log_handler)
+
+def _rotated_files(path):
+    """Return path followed by its existing rotated copies (path.1, path.2, ...)."""
+    files = [path] if os.path.exists(path) else []
+    i = 1
+    while os.path.exists(f"{path}.{i}"):
+        files.append(f"{path}.{i}")
+        i += 1
+    return files
 
-    # Create the file with headers if it doesn't exist
-    if not os.path.exists(log_file):
-        with open(log_file, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(['Timestamp', 'Action', 'Result', 'Details'])
+# ---------------------------------------------------------------------------
+# Metrics — a small in-process registry of counters, gauges and histograms,
+# rendered in the Prometheus text exposition format at /metrics.  Every
+# sample lives in a dict keyed by its label values, so updates are a lock
+# and a dict write.
+# ---------------------------------------------------------------------------
+METRICS_PREFIX = 'homelab_'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+WAKE_BUCKETS = (5, 10, 20, 30, 45, 60, 90, 120, 180, 300)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = METRICS_PREFIX + name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def remove(self, **labels):
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labels, key, extra)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def time(self, **labels):
+        """Context manager observing the duration of its block."""
+        histogram = self
+
+        class _Timer:
+            def __enter__(self):
+                self.start = time.monotonic()
+                return self
+
+            def __exit__(self, *exc):
+                histogram.observe(time.monotonic() - self.start, **labels)
+                return False
+
+        return _Timer()
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in items:
+            for bound, count in zip(self.buckets, counts):
+                samples.append((f"{self.name}_bucket", key, (('le', _format_value(bound)),), count))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), counts[-1]))
+        return samples
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def add_collector(self, func):
+        """Register a callable run before each scrape to refresh derived gauges."""
+        self._collectors.append(func)
+        return func
+
+    def render(self):
+        for collect in self._collectors:
+            try:
+                collect()
+            except Exception as e:
+                system_logger.warning(f"Metrics collector {collect.__name__} failed: {str(e)}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+http_requests = metrics.counter(
+    'http_requests_total', 'HTTP requests handled, by route and status.',
+    ('method', 'endpoint', 'status'))
+http_latency = metrics.histogram(
+    'http_request_duration_seconds', 'Time spent handling HTTP requests.', ('method', 'endpoint'))
+probe_rounds = metrics.histogram(
+    'probe_round_duration_seconds', 'Duration of one concurrent reachability probe round.')
+probe_results = metrics.counter(
+    'probes_total', 'Host probes, by method and outcome.', ('method', 'result'))
+device_up = metrics.gauge(
+    'device_up', 'Whether the device answered its last probe (1) or not (0).', ('device',))
+device_rtt = metrics.gauge(
+    'device_rtt_seconds', 'Round-trip time of the last successful probe.', ('device',))
+wake_duration = metrics.histogram(
+    'wake_duration_seconds', 'Time from magic packet to the device being ready.',
+    ('device',), WAKE_BUCKETS)
+wake_results = metrics.counter(
+    'wakes_total', 'Wake confirmations, by outcome.', ('device', 'result'))
+ssh_connect_latency = metrics.histogram(
+    'ssh_connect_duration_seconds', 'Time to open a new SSH session.', ('device',))
+ssh_commands = metrics.counter(
+    'ssh_commands_total', 'Commands run over SSH, by outcome.', ('device', 'result'))
+shutdown_results = metrics.counter(
+    'shutdowns_total', 'Suspend attempts over SSH, by outcome.', ('device', 'result'))
+tautulli_latency = metrics.histogram(
+    'tautulli_fetch_duration_seconds', 'Duration of one Tautulli refresh cycle.')
+tautulli_errors = metrics.counter(
+    'tautulli_fetch_errors_total', 'Failed Tautulli refresh cycles.')
+plex_cache_requests = metrics.counter(
+    'plex_cache_requests_total', 'Plex stream cache lookups; miss means a refresh was started.',
+    ('result',))
+config_writes = metrics.counter(
+    'config_writes_total', 'Configuration flushes that rewrote config.json.')
+config_write_latency = metrics.histogram(
+    'config_write_duration_seconds', 'Time to write config.json atomically.')
+device_load = metrics.gauge(
+    'device_load1', '1-minute load average reported by SSH telemetry.', ('device',))
+device_temperature = metrics.gauge(
+    'device_temperature_celsius', 'Hottest thermal zone reported by SSH telemetry.', ('device',))
+device_logins = metrics.gauge(
+    'device_logged_in_users', 'Login sessions (who) reported by SSH telemetry.', ('device',))
+
+# Activity log for user actions and device status changes.  Rows are queued
+# and written in batches by one background thread holding a single file
+# handle, rotated by size like system.log.
+ACTIVITY_LOG_FILE = os.path.join(log_dir, 'activity.csv')
+ACTIVITY_HEADER = ['Timestamp', 'Action', 'Result', 'Details']
+ACTIVITY_MAX_BYTES = 1024 * 1024 * 5  # 5 MB
+ACTIVITY_BACKUP_COUNT = 5
+ACTIVITY_FLUSH_INTERVAL = 2  # seconds
+ACTIVITY_BATCH_SIZE = 100
+ACTIVITY_READ_WAIT = 2  # seconds a log read waits for rows logged before it
+
+class ActivityLogWriter:
+    def __init__(self, path, max_bytes=ACTIVITY_MAX_BYTES, backup_count=ACTIVITY_BACKUP_COUNT,
+                 listeners=()):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        # Callables handed every written batch (e.g. the SQLite event store)
+        self.listeners = list(listeners)
+        self._queue = queue.Queue()
+        # Rows queued / fully written (file and listeners), for flush()
+        self._progress = threading.Condition()
+        self._queued = 0
+        self._written = 0
+        self._file = None
+        self._writer = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+
+    def start(self):
+        """Start the writer thread; rows written before this are queued."""
+        if not self._thread.is_alive():
+            self._thread.start()
+
+    def write(self, row):
+        with self._progress:
+            self._queued += 1
+            self._queue.put(row)
+
+    def flush(self, timeout=None):
+        """Wait until the rows queued before this call are written.
+
+        Rows logged meanwhile are not waited for, so a steady stream of
+        writes cannot starve the caller.  Returns False on timeout.
+        """
+        if self._closed or not self._thread.is_alive():
+            return True
+        with self._progress:
+            target = self._queued
+            return self._progress.wait_for(lambda: self._written >= target or self._closed, timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        with self._progress:
+            self._closed = True
+            self._progress.notify_all()
+
+    def _open(self):
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        # Create the file with headers if it is new
+        if self._file.tell() == 0:
+            self._writer.writerow(ACTIVITY_HEADER)
+
+    def _rollover(self):
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write_batch(self, rows):
+        if self._file is None:
+            self._open()
+        for row in rows:
+            self._writer.writerow(row)
+        self._file.flush()
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._rollover()
+        for listener in self.listeners:
+            try:
+                listener(rows)
+            except Exception as e:
+                system_logger.error(f"Activity log listener failed: {str(e)}")
 
-    # Append the new activity
-    with open(log_file, 'a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([timestamp, action, result, details])
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                rows = [self._queue.get(timeout=ACTIVITY_FLUSH_INTERVAL)]
+            except queue.Empty:
+                continue
+            # Drain whatever else is already queued into the same batch
+            while len(rows) < ACTIVITY_BATCH_SIZE:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in rows:
+                stopping = True
+                rows = [r for r in rows if r is not None]
+            try:
+                if rows:
+                    self._write_batch(rows)
+            except Exception as e:
+                system_logger.error(f"Failed to write activity log: {str(e)}")
+            finally:
+                with self._progress:
+                    self._written += len(rows)
+                    self._progress.notify_all()
+        if self._file is not None:
+            self._file.close()
+
+# ---------------------------------------------------------------------------
+# Activity event store — an SQLite copy of the activity log, indexed on
+# timestamp and action, so history can be filtered and aggregated server-side.
+# It is fed by the activity writer thread and, on first run, imports whatever
+# is already in activity.csv (and its rotated files).
+# ---------------------------------------------------------------------------
+ACTIVITY_DB_FILE = os.path.join(log_dir, 'activity.db')
+ACTIVITY_GROUPS = {
+    'day': "substr(timestamp, 1, 10)",
+    'action': "action",
+    'result': "result"
+}
+
+class ActivityEventStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS activity ("
+                "id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, action TEXT NOT NULL, "
+                "result TEXT, details TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_timestamp ON activity (timestamp)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_activity_action ON activity (action, result, timestamp)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    @staticmethod
+    def _rows(rows):
+        return [(r[0], r[1], r[2], r[3]) for r in rows if len(r) >= 4 and r != ACTIVITY_HEADER]
+
+    def insert_many(self, rows):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO activity (timestamp, action, result, details) VALUES (?, ?, ?, ?)",
+                self._rows(rows))
+
+    def import_csv(self, csv_path):
+        """Import activity.csv and its rotated files once; later calls are no-ops."""
+        imported = 0
+        with self._lock, self._conn:
+            if self._conn.execute("SELECT value FROM meta WHERE key = 'csv_imported'").fetchone():
+                return 0
+            # Oldest rotated file first so ids follow time order; one transaction
+            for path in reversed(_rotated_files(csv_path)):
+                with open(path, 'r', newline='') as f:
+                    rows = self._rows(csv.reader(f))
+                self._conn.executemany(
+                    "INSERT INTO activity (timestamp, action, result, details) VALUES (?, ?, ?, ?)", rows)
+                imported += len(rows)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_imported', ?)",
+                               (datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+        if imported:
+            system_logger.info(f"Imported {imported} activity rows from {csv_path} into {self.path}")
+        return imported
+
+    def query(self, actions=None, results=None, start=None, end=None, limit=100, offset=0, group_by=None):
+        """Filter activity rows; return a page of rows, or counts per group_by key."""
+        clauses = []
+        params = []
+        if actions:
+            clauses.append(f"action IN ({', '.join('?' * len(actions))})")
+            params.extend(actions)
+        if results:
+            clauses.append(f"result IN ({', '.join('?' * len(results))})")
+            params.extend(results)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            # A bare date means "through the end of that day"
+            clauses.append("timestamp <= ?")
+            params.append(f"{end} 23:59:59" if len(end) == 10 else end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM activity {where}", params).fetchone()[0]
+            if group_by:
+                key = ACTIVITY_GROUPS[group_by]
+                cursor = self._conn.execute(
+                    f"SELECT {key} AS k, COUNT(*) FROM activity {where} GROUP BY k ORDER BY k", params)
+                return {'total': total, 'group_by': group_by,
+                        'groups': [{'key': k, 'count': n} for k, n in cursor]}
+            cursor = self._conn.execute(
+                f"SELECT timestamp, action, result, details FROM activity {where} "
+                f"ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?", params + [limit, offset])
+            rows = [{'timestamp': t, 'action': a, 'result': r, 'details': d} for t, a, r, d in cursor]
+        return {'total': total, 'limit': limit, 'offset': offset, 'rows': rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+event_store = ActivityEventStore(ACTIVITY_DB_FILE)
+
+def _init_event_store():
+    event_store.open()
+    try:
+        event_store.import_csv(ACTIVITY_LOG_FILE)
+    except Exception as e:
+        system_logger.error(f"Failed to import {ACTIVITY_LOG_FILE}: {str(e)}")
+
+activity_log = ActivityLogWriter(ACTIVITY_LOG_FILE, listeners=[event_store.insert_many])
+atexit.register(activity_log.close)
+
+def log_activity(action, result, details=None):
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    activity_log.write([timestamp, action, result, details])
 
 # Configuration
 CONFIG_FILE = 'config.json'
@@ -75,6 +541,19 @@ default_config = {
     }
 }
 
+CONFIG_FLUSH_DELAY = 2  # seconds; coalesces bursts of saves into one write
+# Runtime-only keys: kept in memory, never written to disk
+RUNTIME_KEYS = ('state', 'scheduled_off_time')
+
+def _write_json_atomic(path, data):
+    """Write JSON to a temp file, fsync it and rename it over path."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 # Load or create configuration
 def load_config():
     if os.path.exists(CONFIG_FILE):
@@ -85,21 +564,113 @@ def load_config():
             system_logger.error(f"Error parsing {CONFIG_FILE}. Using default config.")
             return default_config.copy()
     else:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(default_config, f)
+        persisted = {k: v for k, v in default_config.items() if k not in RUNTIME_KEYS}
+        _write_json_atomic(CONFIG_FILE, persisted)
         system_logger.info(f"Created new configuration file: {CONFIG_FILE}")
         return default_config.copy()
 
+class ConfigStore:
+    """In-memory authoritative configuration with debounced, atomic flushes.
+
+    Reads never touch the disk.  save() schedules a flush CONFIG_FLUSH_DELAY
+    seconds later; the flush serializes the persistent keys and only writes
+    (temp file + os.replace) when they differ from what is already on disk,
+    so runtime keys such as 'state' never cause a write.
+    """
+
+    def __init__(self, path, data=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._flush_timer = None
+        self.load(data or {})
+
+    def load(self, data):
+        """Replace the in-memory configuration with data read from disk."""
+        with self._lock:
+            self._runtime = {k: data.get(k, default_config.get(k)) for k in RUNTIME_KEYS}
+            self._data = {k: v for k, v in data.items() if k not in RUNTIME_KEYS}
+            self._written = self._serialize()
+
+    def __getitem__(self, key):
+        with self._lock:
+            if key in RUNTIME_KEYS:
+                return self._runtime[key]
+            return self._data[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            if key in RUNTIME_KEYS:
+                self._runtime[key] = value
+            else:
+                self._data[key] = value
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._runtime or key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in RUNTIME_KEYS:
+                return self._runtime.get(key, default)
+            return self._data.get(key, default)
+
+    def exchange(self, key, value):
+        """Set key and return its previous value in one atomic step."""
+        with self._lock:
+            previous = self.get(key)
+            self[key] = value
+            return previous
+
+    def _serialize(self):
+        with self._lock:
+            return json.dumps(self._data, indent=4)
+
+    def save(self):
+        """Schedule a coalesced flush of the persistent configuration."""
+        with self._lock:
+            if self._flush_timer is not None:
+                return
+            self._flush_timer = threading.Timer(CONFIG_FLUSH_DELAY, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self):
+        """Write the persistent configuration now if it changed."""
+        # Snapshot under _write_lock: of two overlapping flushes (debounce
+        # timer and shutdown) the last writer then has the newest data
+        with self._write_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                serialized = self._serialize()
+                if serialized == self._written:
+                    return False
+                data = json.loads(serialized)
+            with config_write_latency.time():
+                _write_json_atomic(self.path, data)
+            config_writes.inc()
+            with self._lock:
+                self._written = serialized
+        return True
+
 # Save configuration
 def save_config(config):
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=4)
+        config.save()
+    except Exception as e:
+        system_logger.error(f"Failed to save configuration: {str(e)}")
+
+def flush_config():
+    try:
+        config.flush()
     except Exception as e:
         system_logger.error(f"Failed to save configuration: {str(e)}")
 
-config = load_config()
-off_timer = None
+# Empty until init() loads config.json
+config = ConfigStore(CONFIG_FILE)
+atexit.register(flush_config)
 
 def ensure_config_defaults():
     # Add missing keys to existing configs without overwriting user values
@@ -120,96 +691,624 @@ def ensure_config_defaults():
     if changed:
         save_config(config)
 
-ensure_config_defaults()
+def _init_config():
+    config.load(load_config())
+    ensure_config_defaults()
 
 # ---------------------------------------------------------------------------
-# Plex stream cache — avoids hitting the Plex API on every 5-second poll.
-# Cached for PLEX_CACHE_TTL seconds; stale on error so the UI keeps showing
-# the last known state rather than flashing empty.
+# Device registry — every managed host is addressed by name.  The two legacy
+# entries keep their config keys ('target_device', 'pc_device'); any number of
+# extra hosts can be listed under config['devices'], each with optional
+# 'groups' so they can be woken, shut down or checked together.
 # ---------------------------------------------------------------------------
-PLEX_CACHE_TTL = 10  # seconds
-_plex_cache = {
-    'streams': [],
-    'fetched_at': 0
-}
+LEGACY_DEVICES = ('target_device', 'pc_device')
+DEFAULT_SHUTDOWN_COMMAND = 'systemctl suspend --no-wall'
+
+def device_names():
+    names = [name for name in LEGACY_DEVICES if name in config]
+    names.extend(config.get('devices', {}))
+    return names
+
+def get_device(name):
+    """Return the config dict for a device; raises KeyError for unknown names."""
+    if name in LEGACY_DEVICES:
+        return config[name]
+    return config.get('devices', {})[name]
+
+def device_groups(name):
+    return list(get_device(name).get('groups', []))
+
+def devices_in_group(group):
+    """Names of the devices in a group; 'all' matches every device."""
+    if group == 'all':
+        return device_names()
+    return [name for name in device_names() if group in device_groups(name)]
+
+def device_in_restricted_hours(name):
+    """Whether a wake must be refused now (the server respects restricted hours by default)."""
+    if not get_device(name).get('restricted_hours', name == 'target_device'):
+        return False
+    return check_restricted_hours()
 
-def _fetch_plex_streams():
-    """Query Tautulli get_activity endpoint and return a list of active streams."""
-    plex_cfg = config.get('plex', {})
-    ip = plex_cfg.get('tautulli_ip', '').strip()
-    port = plex_cfg.get('tautulli_port', 7979)
-    apikey = plex_cfg.get('tautulli_apikey', '').strip()
+# ---------------------------------------------------------------------------
+# Tautulli collector — each refresh cycle sends every command in
+# TAUTULLI_COMMANDS over one reused keep-alive HTTP connection.  get_activity
+# already carries each session's bandwidth, LAN/WAN location and transcode
+# decision, so one cycle yields the stream list, the current load summary and
+# the session start/stop events kept in logs/plex.db.
+# ---------------------------------------------------------------------------
+TAUTULLI_TIMEOUT = 4  # seconds
+TAUTULLI_COMMANDS = ('get_activity', 'server_status')
+PLEX_DB_FILE = os.path.join(log_dir, 'plex.db')
 
-    if not ip or not apikey:
-        return []  # Not configured — silently return empty
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+class PlexSessionStore:
+    """One row per playback session; written when a session starts and stops."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id INTEGER PRIMARY KEY, session_key TEXT NOT NULL, user TEXT, title TEXT, "
+                "media_type TEXT, player TEXT, location TEXT, transcode_decision TEXT, "
+                "bandwidth_kbps INTEGER, started_at REAL NOT NULL, stopped_at REAL, "
+                "stop_estimated INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_started ON sessions (started_at)")
+
+    def open_sessions(self):
+        """{session_key: row id} of sessions never seen to stop (e.g. before a restart)."""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT session_key, id FROM sessions WHERE stopped_at IS NULL").fetchall())
+
+    def start(self, key, session, now):
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "INSERT INTO sessions (session_key, user, title, media_type, player, location, "
+                "transcode_decision, bandwidth_kbps, started_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, session.get('friendly_name') or session.get('user'),
+                 session.get('full_title') or session.get('title'), session.get('media_type'),
+                 session.get('player'), session.get('location'), session.get('transcode_decision'),
+                 _as_int(session.get('bandwidth')), now)).lastrowid
+
+    def stop(self, row_id, now, bandwidth_kbps=None, estimated=False):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE sessions SET stopped_at = ?, stop_estimated = ?, "
+                "bandwidth_kbps = MAX(bandwidth_kbps, ?) WHERE id = ?",
+                (now, int(estimated), bandwidth_kbps or 0, row_id))
+
+    def stats(self, start, end):
+        """Session aggregates for sessions overlapping [start, end)."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT started_at, COALESCE(stopped_at, ?), user, location, transcode_decision "
+                "FROM sessions WHERE started_at < ? AND COALESCE(stopped_at, ?) > ?",
+                (now, end, now, start)).fetchall()
+        by_hour = [0.0] * 24
+        watched = 0.0
+        for started, stopped, _, _, _ in rows:
+            t, until = max(started, start), min(stopped, end)
+            watched += max(until - t, 0)
+            # Spread the session over the local hours of day it covered
+            while t < until:
+                moment = datetime.datetime.fromtimestamp(t)
+                hour_end = (moment.replace(minute=0, second=0, microsecond=0)
+                            + datetime.timedelta(hours=1)).timestamp()
+                chunk = min(until, hour_end) - t
+                by_hour[moment.hour] += chunk
+                t += chunk
+        transcodes = sum(1 for r in rows if r[4] == 'transcode')
+        return {
+            'sessions': len(rows),
+            'users': len({r[2] for r in rows if r[2]}),
+            'watch_hours': round(watched / 3600, 2),
+            'transcode_sessions': transcodes,
+            'transcode_share': round(transcodes / len(rows), 3) if rows else None,
+            'lan_sessions': sum(1 for r in rows if r[3] == 'lan'),
+            'wan_sessions': sum(1 for r in rows if r[3] == 'wan'),
+            'watch_minutes_by_hour': [round(seconds / 60, 1) for seconds in by_hour]
+        }
 
-    url = f'http://{ip}:{port}/api/v2?cmd=get_activity&apikey={apikey}'
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
 
-    try:
-        req = urllib.request.Request(url)
-        with urllib.request.urlopen(req, timeout=4) as resp:
-            data = json.loads(resp.read().decode())
-    except Exception as e:
-        system_logger.warning(f"Tautulli API request failed: {e}")
-        return None  # None signals "use stale cache"
+plex_sessions = PlexSessionStore(PLEX_DB_FILE)
 
-    if data.get('response', {}).get('result') != 'success':
-        system_logger.warning(f"Tautulli returned non-success: {data}")
-        return None
+def _stream_view(session):
+    """The fields the UI shows for a session."""
+    media_type = session.get('media_type', 'unknown')
+    title = session.get('title', 'Unknown')
+    grandparent_title = session.get('grandparent_title', '')
 
-    sessions = data.get('response', {}).get('data', {}).get('sessions', [])
-    streams = []
-    for s in sessions:
-        media_type = s.get('media_type', 'unknown')
-        title = s.get('title', 'Unknown')
-        grandparent_title = s.get('grandparent_title', '')
-        user = s.get('friendly_name', '')
-        resolution = s.get('video_full_resolution', '')
-        state = s.get('state', '')
-
-        # For episodes: "Show — Episode Title"
-        if media_type == 'episode' and grandparent_title:
-            display_title = f"{grandparent_title} \u2014 {title}"
-        else:
-            display_title = title
-
-        streams.append({
-            'title': display_title,
-            'type': media_type,
-            'user': user,
-            'quality': resolution,
-            'state': state
-        })
+    # For episodes: "Show — Episode Title"
+    if media_type == 'episode' and grandparent_title:
+        display_title = f"{grandparent_title} \u2014 {title}"
+    else:
+        display_title = title
+
+    return {
+        'title': display_title,
+        'type': media_type,
+        'user': session.get('friendly_name', ''),
+        'quality': session.get('video_full_resolution', ''),
+        'state': session.get('state', '')
+    }
+
+class TautulliCollector:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_target = None
+        self._open = None  # session_key -> {'id': row id, 'bandwidth': peak kbps}
+        self.current = None  # load summary from the last successful cycle
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+
+    def _command(self, target, apikey, cmd):
+        path = f"/api/v2?{urllib.parse.urlencode({'apikey': apikey, 'cmd': cmd})}"
+        for attempt in (1, 2):
+            reused = self._conn is not None and self._conn_target == target
+            if not reused:
+                self._close()
+                self._conn = http.client.HTTPConnection(*target, timeout=TAUTULLI_TIMEOUT)
+                self._conn_target = target
+            try:
+                self._conn.request('GET', path)
+                response = self._conn.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                self._close()
+                # A reused connection may have been closed by Tautulli while idle
+                if not reused or attempt == 2:
+                    raise
+        if response.will_close:
+            self._close()
+        if response.status != 200:
+            raise ValueError(f"Tautulli {cmd} returned HTTP {response.status}")
+        data = json.loads(body.decode())
+        if data.get('response', {}).get('result') != 'success':
+            raise ValueError(f"Tautulli returned non-success: {data.get('response', {}).get('message')}")
+        return data['response'].get('data') or {}
+
+    def collect(self):
+        """Run one refresh cycle and return the stream list; raises if get_activity fails."""
+        plex_cfg = config.get('plex', {})
+        ip = plex_cfg.get('tautulli_ip', '').strip()
+        port = plex_cfg.get('tautulli_port', 7979)
+        apikey = plex_cfg.get('tautulli_apikey', '').strip()
+
+        if not ip or not apikey:
+            return []  # Not configured — silently return empty
+
+        with self._lock:
+            target = (ip, port)
+            results = {}
+            for cmd in TAUTULLI_COMMANDS:
+                try:
+                    results[cmd] = self._command(target, apikey, cmd)
+                except Exception as e:
+                    if cmd == 'get_activity':
+                        raise
+                    system_logger.warning(f"Tautulli {cmd} failed: {str(e)}")
+            sessions = results['get_activity'].get('sessions', [])
+            now = time.time()
+            try:
+                self._track(sessions, now)
+            except Exception as e:
+                system_logger.error(f"Failed to record Plex sessions: {str(e)}")
+            self.current = self._summary(sessions, results.get('server_status'), now)
+        return [_stream_view(s) for s in sessions]
+
+    def _track(self, sessions, now):
+        live = {str(s.get('session_key') or s.get('session_id')): s for s in sessions}
+        if self._open is None:
+            # First cycle: adopt sessions still playing since before a restart
+            self._open = {}
+            for key, row_id in self.store.open_sessions().items():
+                if key in live:
+                    self._open[key] = {'id': row_id, 'bandwidth': 0}
+                else:
+                    self.store.stop(row_id, now, estimated=True)
+        for key, session in live.items():
+            entry = self._open.get(key)
+            if entry is None:
+                entry = self._open[key] = {'id': self.store.start(key, session, now), 'bandwidth': 0}
+            entry['bandwidth'] = max(entry['bandwidth'], _as_int(session.get('bandwidth')))
+        for key in set(self._open) - set(live):
+            entry = self._open.pop(key)
+            self.store.stop(entry['id'], now, entry['bandwidth'])
+
+    @staticmethod
+    def _summary(sessions, server_status, now):
+        def bandwidth(location=None):
+            return sum(_as_int(s.get('bandwidth')) for s in sessions
+                       if location is None or s.get('location') == location)
+
+        def decisions(decision):
+            return sum(1 for s in sessions if s.get('transcode_decision') == decision)
+
+        return {
+            'streams': len(sessions),
+            'transcodes': decisions('transcode'),
+            'direct_streams': decisions('copy'),
+            'direct_plays': decisions('direct play'),
+            'total_kbps': bandwidth(),
+            'lan_kbps': bandwidth('lan'),
+            'wan_kbps': bandwidth('wan'),
+            'server_connected': (server_status or {}).get('connected'),
+            'updated_at': now
+        }
+
+plex_collector = TautulliCollector(plex_sessions)
 
-    return streams
+# ---------------------------------------------------------------------------
+# Plex stream cache — avoids hitting the Plex API on every 5-second poll.
+# Readers always get the cached list immediately (stale-while-revalidate);
+# once it is older than PLEX_CACHE_TTL a single background refresh is started.
+# Failed refreshes keep the stale list and back off exponentially up to
+# PLEX_BACKOFF_MAX so a down Tautulli is not hammered.
+# ---------------------------------------------------------------------------
+PLEX_CACHE_TTL = 10  # seconds
+PLEX_BACKOFF_MAX = 300  # seconds
+
+class PlexStreamCache:
+    def __init__(self, fetch, ttl=PLEX_CACHE_TTL, backoff_max=PLEX_BACKOFF_MAX):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._streams = []
+        self._fetched_at = 0
+        self._next_refresh = 0
+        self._failures = 0
+        self._last_error = None
+        self._refreshing = False
+
+    def get(self):
+        """Return the cached streams, starting a background refresh if due."""
+        with self._lock:
+            if not self._refreshing and time.time() >= self._next_refresh:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, name='plex-refresh', daemon=True).start()
+                plex_cache_requests.inc(result='miss')
+            else:
+                plex_cache_requests.inc(result='hit')
+            return self._streams
+
+    def _refresh(self):
+        try:
+            with tautulli_latency.time():
+                streams = self._fetch()
+            error = None
+        except Exception as e:
+            streams = None
+            error = str(e)
+            tautulli_errors.inc()
+            system_logger.warning(f"Tautulli API request failed: {error}")
+        now = time.time()
+        with self._lock:
+            if streams is None:
+                # Keep stale data; wait ttl * 2^failures before the next try
+                self._failures += 1
+                self._last_error = error
+                self._next_refresh = now + min(self.ttl * 2 ** self._failures, self.backoff_max)
+            else:
+                self._streams = streams
+                self._fetched_at = now
+                self._failures = 0
+                self._last_error = None
+                self._next_refresh = now + self.ttl
+            self._refreshing = False
+        if streams is not None:
+            events.publish('plex_streams', streams)
+
+    def refresh(self):
+        """Start a background refresh now, ignoring back-off, unless one is in flight."""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, name='plex-refresh', daemon=True).start()
+
+    def fresh(self, max_age):
+        """The cached streams if fetched within max_age and Tautulli is answering, else None."""
+        with self._lock:
+            if not self._fetched_at or self._last_error or time.time() - self._fetched_at > max_age:
+                return None
+            return self._streams
+
+    def status(self):
+        """Cache age, last error and back-off state, for API responses."""
+        with self._lock:
+            now = time.time()
+            return {
+                'age': round(now - self._fetched_at, 1) if self._fetched_at else None,
+                'last_error': self._last_error,
+                'failures': self._failures,
+                'next_refresh_in': max(round(self._next_refresh - now, 1), 0)
+            }
+
+plex_cache = PlexStreamCache(plex_collector.collect)
 
 def get_plex_streams():
-    """Return cached streams, refreshing the cache when TTL has expired."""
-    global _plex_cache
-    now = time.time()
+    """Return cached streams; refreshing happens in the background."""
+    return plex_cache.get()
 
-    if now - _plex_cache['fetched_at'] >= PLEX_CACHE_TTL:
-        result = _fetch_plex_streams()
-        if result is not None:  # None means fetch failed — keep stale data
-            _plex_cache['streams'] = result
-        _plex_cache['fetched_at'] = now
+# ---------------------------------------------------------------------------
+# In-process prober — sends ICMP echo requests itself (unprivileged datagram
+# socket where the kernel allows it, raw socket when running with
+# CAP_NET_RAW) and also tries a TCP connect probe for hosts with a port.  All hosts in a round
+# share one selector loop, so probing N hosts costs one timeout, not N.
+# ---------------------------------------------------------------------------
+PROBE_TIMEOUT = 1.0  # seconds
+PROBE_TCP_DELAY = 0.1  # seconds an echo gets before the TCP probe is also started
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+_icmp_kind = None  # 'dgram', 'raw' or 'none' once detected
+_ping_failed = False  # ping(8) could not be started; warned once
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def _icmp_echo_packet(ident, seq):
+    payload = struct.pack('!d', time.monotonic())
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _icmp_checksum(header + payload)
+    return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, ident, seq) + payload
+
+def _open_icmp_socket():
+    """Return (socket, kind) for ICMP probing, or (None, 'none') if not permitted."""
+    global _icmp_kind
+    kinds = [_icmp_kind] if _icmp_kind else ['dgram', 'raw']
+    for kind in kinds:
+        if kind == 'none':
+            break
+        sock_type = socket.SOCK_DGRAM if kind == 'dgram' else socket.SOCK_RAW
+        try:
+            sock = socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP)
+        except OSError:
+            continue
+        sock.setblocking(False)
+        if _icmp_kind is None:
+            system_logger.info(f"Prober using {kind} ICMP sockets")
+        _icmp_kind = kind
+        return sock, kind
+    if _icmp_kind is None:
+        system_logger.warning("ICMP sockets not permitted; prober falling back to TCP connect "
+                              "(hosts without probe_port/ssh_port are pinged with ping(8))")
+    _icmp_kind = 'none'
+    return None, 'none'
+
+def _parse_icmp_reply(data, kind):
+    """Return (ident, seq) of an echo reply, or None for anything else."""
+    if kind == 'raw':
+        data = data[(data[0] & 0x0F) * 4:]  # strip the IPv4 header
+    if len(data) < 8:
+        return None
+    icmp_type, _, _, ident, seq = struct.unpack('!BBHHH', data[:8])
+    if icmp_type != ICMP_ECHO_REPLY:
+        return None
+    return ident, seq
 
-    return _plex_cache['streams']
+def _ping_subprocesses(hosts, timeout=PROBE_TIMEOUT):
+    """Run ping(8) for every (name, ip) at once; returns {name: rtt_ms or None}."""
+    global _ping_failed
+    if os.name == 'nt':
+        command = ['ping', '-n', '1', '-w', str(int(timeout * 1000))]
+    else:
+        command = ['ping', '-c', '1', '-W', str(max(int(timeout), 1))]
+    started = time.monotonic()
+    running = {}
+    results = {}
+    for name, ip in hosts:
+        results[name] = None
+        try:
+            running[name] = subprocess.Popen(command + [ip], stdout=subprocess.DEVNULL,
+                                             stderr=subprocess.DEVNULL)
+        except OSError as e:
+            if not _ping_failed:
+                system_logger.warning(f"Could not run ping(8): {str(e)}; "
+                                      f"set probe_port on hosts without ssh_port")
+            _ping_failed = True
+    # ping -W bounds each process; the deadline only guards against a hung one
+    deadline = started + max(timeout, 1) + 1
+    while running and time.monotonic() < deadline:
+        for name, proc in list(running.items()):
+            if proc.poll() is not None:
+                del running[name]
+                if proc.returncode == 0:
+                    results[name] = round((time.monotonic() - started) * 1000, 2)
+        if running:
+            time.sleep(0.01)
+    for proc in running.values():
+        proc.kill()
+        proc.wait()
+    return results
+
+def probe_hosts(targets, timeout=PROBE_TIMEOUT, icmp=True):
+    """Probe many hosts concurrently from one selector loop.
+
+    ``targets`` maps a name to ``(ip, tcp_port)``; ``tcp_port`` may be None.
+    ICMP echo is used when available (and ``icmp`` is true); hosts with a
+    ``tcp_port`` also get a non-blocking TCP connect, started after
+    PROBE_TCP_DELAY if the echo has not been answered by then, so hosts that
+    drop pings still show up.  Either answer counts; a refused connection
+    still proves the host is up, while ``port_open`` is only set when it was
+    accepted.  Returns ``{name: {'online': bool, 'port_open': bool,
+    'rtt_ms': float or None, 'method': str}}``.
+    """
+    round_started = time.monotonic()
+    results = {name: {'online': False, 'port_open': False, 'rtt_ms': None, 'method': None}
+               for name in targets}
+    sel = selectors.DefaultSelector()
+    icmp_sock, kind = _open_icmp_socket() if icmp else (None, 'none')
+    ident = random.getrandbits(16)
+    icmp_pending = {}  # (addr, seq) -> name
+    tcp_pending = {}   # socket -> name
+    tcp_later = []     # (name, addr, port) waiting for PROBE_TCP_DELAY
+    sent_at = {}       # (name, method) -> monotonic send time
+    fallback = []
+
+    def mark_up(name, now, method):
+        if results[name]['online']:
+            return
+        results[name].update(online=True, method=method,
+                             rtt_ms=round((now - sent_at[(name, method)]) * 1000, 2))
+        # The other probe of this host no longer matters
+        for key in [k for k, n in icmp_pending.items() if n == name]:
+            del icmp_pending[key]
+        for tcp in [t for t, n in tcp_pending.items() if n == name]:
+            del tcp_pending[tcp]
+            sel.unregister(tcp)
+            tcp.close()
+
+    def start_tcp(name, addr, port):
+        tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        tcp.setblocking(False)
+        sent_at[(name, 'tcp')] = time.monotonic()
+        results[name]['method'] = results[name]['method'] or 'tcp'
+        err = tcp.connect_ex((addr, int(port)))
+        if err in (0, errno.ECONNREFUSED):
+            tcp.close()
+            results[name]['port_open'] = err == 0
+            mark_up(name, time.monotonic(), 'tcp')
+        elif err in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+            sel.register(tcp, selectors.EVENT_WRITE, name)
+            tcp_pending[tcp] = name
+        else:
+            tcp.close()
 
-def _ping(ip):
     try:
-        if os.name == 'nt':
-            return subprocess.run(['ping', '-n', '1', '-w', '1000', ip],
-                                  stdout=subprocess.DEVNULL,
-                                  stderr=subprocess.DEVNULL).returncode == 0
-        else:
-            return subprocess.run(['ping', '-c', '1', '-W', '1', ip],
-                                  stdout=subprocess.DEVNULL,
-                                  stderr=subprocess.DEVNULL).returncode == 0
-    except Exception:
-        return False
+        for seq, (name, (ip, port)) in enumerate(targets.items(), 1):
+            try:
+                addr = socket.gethostbyname(ip)
+            except OSError as e:
+                system_logger.warning(f"Cannot resolve {ip} for {name}: {str(e)}")
+                continue
+            if icmp_sock is not None:
+                try:
+                    sent_at[(name, 'icmp')] = time.monotonic()
+                    icmp_sock.sendto(_icmp_echo_packet(ident, seq), (addr, 0))
+                    icmp_pending[(addr, seq)] = name
+                    results[name]['method'] = 'icmp'
+                    if port:
+                        tcp_later.append((name, addr, port))
+                    continue
+                except OSError:
+                    pass
+            if not port:
+                fallback.append((name, ip))
+                continue
+            start_tcp(name, addr, port)
+
+        if icmp_pending:
+            sel.register(icmp_sock, selectors.EVENT_READ, None)
+
+        tcp_start = time.monotonic() + PROBE_TCP_DELAY
+        deadline = time.monotonic() + timeout
+        while icmp_pending or tcp_pending or tcp_later:
+            now = time.monotonic()
+            if tcp_later and now >= tcp_start:
+                for name, addr, port in tcp_later:
+                    if not results[name]['online']:
+                        start_tcp(name, addr, port)
+                tcp_later = []
+                continue
+            remaining = deadline - now
+            if remaining <= 0:
+                break
+            if tcp_later:
+                remaining = min(remaining, tcp_start - now)
+            for key, _ in sel.select(remaining):
+                now = time.monotonic()
+                if key.data is None:
+                    while True:
+                        try:
+                            data, (src, _) = icmp_sock.recvfrom(1024)
+                        except (BlockingIOError, InterruptedError):
+                            break
+                        reply = _parse_icmp_reply(data, kind)
+                        if reply is None:
+                            continue
+                        reply_ident, reply_seq = reply
+                        # Datagram sockets get their id rewritten by the kernel
+                        if kind == 'raw' and reply_ident != ident:
+                            continue
+                        name = icmp_pending.get((src, reply_seq))
+                        if name is not None:
+                            mark_up(name, now, 'icmp')
+                elif key.fileobj in tcp_pending:
+                    tcp = key.fileobj
+                    name = tcp_pending.pop(tcp)
+                    sel.unregister(tcp)
+                    err = tcp.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    tcp.close()
+                    if err in (0, errno.ECONNREFUSED):
+                        results[name]['port_open'] = err == 0
+                        mark_up(name, now, 'tcp')
+            if not icmp_pending and icmp_sock is not None and icmp_sock in sel.get_map():
+                sel.unregister(icmp_sock)
+    finally:
+        for tcp in tcp_pending:
+            tcp.close()
+        if icmp_sock is not None:
+            icmp_sock.close()
+        sel.close()
+
+    # Hosts we could not probe in-process (no ICMP, no TCP port) use ping(8),
+    # all started at once so the round still costs one timeout
+    for name, rtt_ms in _ping_subprocesses(fallback, timeout).items():
+        results[name].update(method='subprocess', online=rtt_ms is not None, rtt_ms=rtt_ms)
+
+    for result in results.values():
+        probe_results.inc(method=result['method'] or 'none',
+                          result='up' if result['online'] else 'down')
+    probe_rounds.observe(time.monotonic() - round_started)
+    return results
+
+# ---------------------------------------------------------------------------
+# Wake-on-LAN engine — works out the real directed broadcast for a target from
+# the local interfaces' netmasks, sends from every interface on that subnet
+# (plus the limited broadcast), and retransmits on a short schedule to ride
+# out packet loss.  Packets for many MACs go out in one pass.
+# ---------------------------------------------------------------------------
+WOL_PORT = 9
+WOL_RETRANSMIT_SCHEDULE = (0, 0.1, 0.3)  # seconds after the first send
+INTERFACE_CACHE_TTL = 60  # seconds
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891b
+_interface_cache = {'interfaces': [], 'fetched_at': 0}
 
 def _broadcast_for_ip(ip):
+    """Fallback when no local interface is on the target's subnet: assume a /24."""
     try:
         parts = ip.split('.')
         if len(parts) == 4:
@@ -219,20 +1318,116 @@ def _broadcast_for_ip(ip):
         pass
     return '255.255.255.255'
 
-def send_wol(mac_address, broadcast_ip='255.255.255.255', port=9):
+def local_ipv4_interfaces():
+    """Return [(name, ipaddress.IPv4Interface), ...] for the up IPv4 interfaces."""
+    now = time.time()
+    if now - _interface_cache['fetched_at'] < INTERFACE_CACHE_TTL:
+        return _interface_cache['interfaces']
+    interfaces = []
+    if fcntl is not None:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            for _, name in socket.if_nameindex():
+                request = struct.pack('256s', name[:15].encode())
+                try:
+                    addr = socket.inet_ntoa(fcntl.ioctl(s.fileno(), SIOCGIFADDR, request)[20:24])
+                    mask = socket.inet_ntoa(fcntl.ioctl(s.fileno(), SIOCGIFNETMASK, request)[20:24])
+                except OSError:
+                    continue  # no IPv4 address on this interface
+                iface = ipaddress.IPv4Interface(f"{addr}/{mask}")
+                if not iface.ip.is_loopback:
+                    interfaces.append((name, iface))
+    _interface_cache['interfaces'] = interfaces
+    _interface_cache['fetched_at'] = now
+    return interfaces
+
+def magic_packet(mac_address, secureon=None):
+    """Build a magic packet, optionally with a SecureOn password (6-byte hex or 4-byte dotted)."""
     mac_clean = mac_address.replace(':', '').replace('-', '').lower()
     if len(mac_clean) != 12:
         raise ValueError('Invalid MAC address')
-    mac_bytes = bytes.fromhex(mac_clean)
-    packet = b'\xff' * 6 + (mac_bytes * 16)
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        targets = {broadcast_ip, '255.255.255.255'}
-        for target in targets:
-            try:
-                s.sendto(packet, (target, port))
-            except Exception as e:
-                system_logger.warning(f"WoL send error to {target}:{port}: {str(e)}")
+    packet = b'\xff' * 6 + bytes.fromhex(mac_clean) * 16
+    if secureon:
+        if '.' in secureon:
+            password = bytes(int(part) for part in secureon.split('.'))
+        else:
+            password = bytes.fromhex(secureon.replace(':', '').replace('-', ''))
+        if len(password) not in (4, 6):
+            raise ValueError('SecureOn password must be 4 or 6 bytes')
+        packet += password
+    return packet
+
+def _wol_routes(ip):
+    """[(source address, broadcast address)] to reach ip; '' means any source."""
+    routes = {('', '255.255.255.255')}
+    try:
+        target = ipaddress.IPv4Address(ip) if ip else None
+    except ValueError:
+        target = None
+    matched = False
+    if target is not None:
+        for _, iface in local_ipv4_interfaces():
+            if target in iface.network and iface.network.prefixlen < 31:
+                routes.add((str(iface.ip), str(iface.network.broadcast_address)))
+                matched = True
+    if ip and not matched:
+        routes.add(('', _broadcast_for_ip(ip)))
+    return routes
+
+def send_wol_batch(targets, schedule=WOL_RETRANSMIT_SCHEDULE):
+    """Send magic packets for many targets in one pass, retransmitting per schedule.
+
+    Each target is a dict with 'mac_address' and optionally 'ip_address',
+    'broadcast', 'ports' and 'secureon'.  Invalid MACs raise ValueError before
+    anything is sent.  Returns the number of datagrams sent.
+    """
+    sends = {}  # source address -> {(packet, (broadcast, port))}
+    for target in targets:
+        packet = magic_packet(target['mac_address'], target.get('secureon'))
+        routes = _wol_routes(target.get('ip_address'))
+        if target.get('broadcast'):
+            routes.add(('', target['broadcast']))
+        for source, broadcast in routes:
+            for port in target.get('ports') or (WOL_PORT,):
+                sends.setdefault(source, set()).add((packet, (broadcast, int(port))))
+
+    sockets = {}
+    sent = 0
+    failed = set()
+    try:
+        for source in sends:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            if source:
+                s.bind((source, 0))
+            sockets[source] = s
+        start = time.monotonic()
+        for offset in schedule:
+            delay = start + offset - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            for source, items in sends.items():
+                for packet, addr in items:
+                    try:
+                        sockets[source].sendto(packet, addr)
+                        sent += 1
+                    except OSError as e:
+                        if addr not in failed:
+                            failed.add(addr)
+                            system_logger.warning(f"WoL send error to {addr[0]}:{addr[1]}: {str(e)}")
+    finally:
+        for s in sockets.values():
+            s.close()
+    return sent
+
+def _wol_target(name):
+    device = get_device(name)
+    ports = device.get('wol_port', WOL_PORT)
+    return {
+        'mac_address': device['mac_address'],
+        'ip_address': device.get('ip_address'),
+        'ports': ports if isinstance(ports, list) else [ports],
+        'secureon': device.get('secureon_password') or None
+    }
 
 def check_restricted_hours():
     now = datetime.datetime.now()
@@ -242,172 +1437,1652 @@ def check_restricted_hours():
 
     return start <= current_hour < end
 
-def check_device_status():
-    """Check if the device is reachable via ping"""
-    try:
-        ip = config['target_device']['ip_address']
-        is_online = _ping(ip)
+# ---------------------------------------------------------------------------
+# Server-Sent Events — every open tab holds one /api/events connection and is
+# pushed a message only when a channel's payload actually changes.  Channels
+# are re-evaluated on each monitor tick and right after control actions.
+# ---------------------------------------------------------------------------
+EVENT_HEARTBEAT = 15  # seconds between keep-alive comments
+EVENT_QUEUE_SIZE = 100
+
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._last = {}
+
+    def has_subscribers(self):
+        with self._lock:
+            return bool(self._subscribers)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(q)
+            current = list(self._last.items())
+        # Prime the new subscriber with the latest value of every channel
+        for event, payload in current:
+            q.put_nowait((event, payload))
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event, payload):
+        """Send payload to all subscribers unless it equals the last one sent."""
+        with self._lock:
+            if self._last.get(event) == payload:
+                return False
+            self._last[event] = payload
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait((event, payload))
+            except queue.Full:
+                # Client is not reading; drop it rather than grow without bound
+                self._evict(q)
+        return True
 
-        # Log state changes
-        current_state = config.get('state', False)
-        if current_state != is_online:
-            log_activity('state_change', 'success',
-                         f"Device state changed from {current_state} to {is_online}")
+    def _evict(self, q):
+        """Unsubscribe a stalled client and end its stream with a None.
 
-        return is_online
-    except Exception as e:
-        system_logger.error(f"Error checking device status: {str(e)}")
-        return False
+        The browser's EventSource then reconnects and is primed with fresh
+        state, instead of idling on heartbeats from a dead queue.
+        """
+        self.unsubscribe(q)
+        while True:
+            try:
+                while True:
+                    q.get_nowait()  # the backlog is stale anyway
+            except queue.Empty:
+                pass
+            try:
+                q.put_nowait(None)
+                return
+            except queue.Full:
+                continue  # a concurrent publish refilled it
 
-def check_device_status_ip(ip):
-    try:
-        return _ping(ip)
-    except Exception as e:
-        system_logger.error(f"Error checking device status for {ip}: {str(e)}")
-        return False
+events = EventBus()
 
-def wake_on_lan():
-    """Send Wake-on-LAN magic packet"""
-    try:
-        mac = config['target_device']['mac_address']
-        ip = config['target_device']['ip_address']
-        bcast = _broadcast_for_ip(ip)
-        system_logger.info(f"Sending WoL packet to {mac} via {bcast}")
-        send_wol(mac, bcast)
-
-        # Give the device some time to boot
-        time.sleep(2)
-
-        # Check if wake-up was successful
-        attempts = 0
-        max_attempts = 5
-        while attempts < max_attempts:
-            is_online = check_device_status()
-            if is_online:
-                system_logger.info(f"Device is now online after WoL")
-                config['state'] = True
+def _status_payload():
+    return {
+        'state': config['state'],
+        'scheduled_off_time': config['scheduled_off_time'],
+        'in_restricted_hours': check_restricted_hours()
+    }
+
+def notify_status():
+    events.publish('status', _status_payload())
+
+def notify_all():
+    """Re-evaluate every channel; only changed payloads reach the clients."""
+    notify_status()
+    pc = monitor.get('pc_device')
+    if pc is not None:
+        events.publish('pc_status', {'online': pc['online']})
+    if events.has_subscribers():
+        events.publish('plex_streams', get_plex_streams())
+
+# ---------------------------------------------------------------------------
+# Reachability monitor — one background thread probes every configured device
+# every MONITOR_INTERVAL seconds and keeps the latest result in memory, so the
+# status endpoints read a snapshot instead of forking a ping per request.
+# ---------------------------------------------------------------------------
+MONITOR_INTERVAL = 5  # seconds
+class ReachabilityMonitor:
+    def __init__(self, interval=MONITOR_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._snapshot = {}
+        self._stop = threading.Event()
+        self._thread = None
+        # Called after every probe round (event publishing, idle policies, ...)
+        self.tick_hooks = []
+
+    def _targets(self):
+        targets = {}
+        for name in device_names():
+            device = get_device(name)
+            ip = device.get('ip_address', '').strip()
+            if ip:
+                # TCP probe port: explicit probe_port, else the SSH port
+                targets[name] = (ip, device.get('probe_port', device.get('ssh_port')))
+        return targets
+
+    def _record(self, name, ip, online, rtt_ms):
+        with self._lock:
+            previous = self._snapshot.get(name)
+            self._snapshot[name] = {
+                'ip_address': ip,
+                'online': online,
+                'rtt_ms': rtt_ms,
+                'checked_at': time.time()
+            }
+        device_up.set(1 if online else 0, device=name)
+        if rtt_ms is not None:
+            device_rtt.set(rtt_ms / 1000, device=name)
+        was_online = previous is not None and previous['online']
+        if online and not was_online and get_device(name).get('ssh_username'):
+            ssh_pool.warm(name)
+        elif was_online and not online:
+            # Host went away — its pooled SSH transport is dead
+            ssh_pool.close(name)
+        if name == 'target_device':
+            current_state = config.exchange('state', online)
+            if previous is None:
+                # First probe since start: the initial state, not a change
+                system_logger.info(f"{name} ({ip}) is {'online' if online else 'offline'}")
+            elif bool(current_state) != online:
+                log_activity('state_change', 'success',
+                             f"Device state changed from {current_state} to {online}")
                 save_config(config)
-                log_activity('wake_on_lan', 'success', f"Device woken up after {attempts+1} attempts")
-                return True
+        elif previous is not None and previous['online'] != online:
+            system_logger.info(f"{name} ({ip}) state changed from {previous['online']} to {online}")
+
+    def _probe(self, targets):
+        results = probe_hosts(targets)
+        for name, (ip, _) in targets.items():
+            self._record(name, ip, results[name]['online'], results[name]['rtt_ms'])
+        return results
+
+    def refresh(self, name):
+        """Probe a device immediately, bypassing the cadence (used while waking)."""
+        targets = self._targets()
+        if name not in targets:
+            raise KeyError(f"No IP address configured for {name}")
+        return self._probe({name: targets[name]})[name]['online']
+
+    def probe_many(self, names):
+        """Probe the named devices in one concurrent round; returns probe results."""
+        targets = self._targets()
+        return self._probe({name: targets[name] for name in names if name in targets})
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._snapshot.items()}
+
+    def probe_all(self):
+        try:
+            self._probe(self._targets())
+        except Exception as e:
+            system_logger.error(f"Error probing devices: {str(e)}")
+
+    def get(self, name):
+        """Return the latest snapshot entry for a device, or None if never probed."""
+        with self._lock:
+            entry = self._snapshot.get(name)
+            return dict(entry) if entry else None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            for hook in self.tick_hooks:
+                try:
+                    hook()
+                except Exception as e:
+                    system_logger.error(f"Error in monitor hook {hook.__name__}: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='reachability-monitor', daemon=True)
+        self._thread.start()
+        system_logger.info(f"Reachability monitor started (interval {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+monitor = ReachabilityMonitor()
+monitor.tick_hooks.append(notify_all)
+
+def _no_progress(phase, message=None):
+    pass
 
-            system_logger.info(f"Waiting for device to wake up (attempt {attempts+1}/{max_attempts})")
-            time.sleep(2)
-            attempts += 1
+# ---------------------------------------------------------------------------
+# Wake confirmation — instead of a fixed sleep-and-retry loop, each device gets
+# a deadline from a boot-time model learned from its past successful wakes
+# (read back from the activity store).  Polling starts fast, backs off, and
+# speeds up again when the device is due; a device counts as online once it
+# answers ping *and* its service port (service_port, else the SSH port)
+# accepts connections.
+# ---------------------------------------------------------------------------
+WAKE_POLL_INITIAL = 0.5  # seconds between the first checks
+WAKE_POLL_BACKOFF = 1.5
+WAKE_POLL_MAX = 5  # seconds
+WAKE_TIMEOUT_DEFAULT = 90  # seconds, used until a device has boot history
+WAKE_TIMEOUT_MIN = 20
+WAKE_TIMEOUT_MAX = 300
+WAKE_TIMEOUT_FACTOR = 2  # deadline = factor x p90 of observed boot times
+BOOT_SAMPLES = 20
+BOOT_SAMPLE_MIN = 1.0  # seconds; older logs recorded hosts that were already up as ~0s boots
+WAKE_ACTIONS = {'wake_on_lan': 'target_device', 'pc_wake_on_lan': 'pc_device', 'device_wake': None}
+_wake_detail_re = re.compile(r'^(?P<name>\S+).*? after (?P<value>[\d.]+)(?P<unit>s\b| attempts)')
+
+class BootTimeModel:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = None
+
+    def _load(self):
+        """Seed samples from successful wakes already in the activity store."""
+        samples = {}
+        rows = event_store.query(actions=list(WAKE_ACTIONS), results=['success'], limit=1000)['rows']
+        for row in reversed(rows):
+            match = _wake_detail_re.match(row['details'] or '')
+            if not match:
+                continue
+            name = WAKE_ACTIONS[row['action']] or match.group('name')
+            value = float(match.group('value'))
+            if match.group('unit') != 's':
+                # Old fixed loop: 2s initial sleep, then ~2s per extra attempt
+                value = 2 * value
+            if value < BOOT_SAMPLE_MIN:
+                continue
+            samples.setdefault(name, collections.deque(maxlen=BOOT_SAMPLES)).append(value)
+        return samples
+
+    def _device_samples(self, name):
+        with self._lock:
+            if self._samples is None:
+                try:
+                    self._samples = self._load()
+                except Exception as e:
+                    system_logger.error(f"Could not load boot history: {str(e)}")
+                    self._samples = {}
+            return sorted(self._samples.get(name, ()))
+
+    def record(self, name, seconds):
+        self._device_samples(name)
+        with self._lock:
+            self._samples.setdefault(name, collections.deque(maxlen=BOOT_SAMPLES)).append(seconds)
+
+    def stats(self, name):
+        samples = self._device_samples(name)
+        if not samples:
+            return {'samples': 0, 'median': None, 'p90': None}
+        return {
+            'samples': len(samples),
+            'median': round(samples[len(samples) // 2], 1),
+            'p90': round(samples[min(int(len(samples) * 0.9), len(samples) - 1)], 1)
+        }
 
-        system_logger.warning(f"Failed to wake device after {max_attempts} attempts")
-        log_activity('wake_on_lan', 'failed', f"Device failed to respond after {max_attempts} attempts")
-        return False
-    except Exception as e:
-        system_logger.error(f"Error sending WoL packet: {str(e)}")
-        log_activity('wake_on_lan', 'error', str(e))
-        return False
+    def timeout(self, name):
+        p90 = self.stats(name)['p90']
+        if p90 is None:
+            return WAKE_TIMEOUT_DEFAULT
+        return min(max(p90 * WAKE_TIMEOUT_FACTOR, WAKE_TIMEOUT_MIN), WAKE_TIMEOUT_MAX)
+
+boot_model = BootTimeModel()
+
+def _service_port(name):
+    device = get_device(name)
+    if device.get('service_port'):
+        return device['service_port']
+    return device.get('ssh_port', 22) if device.get('ssh_username') else None
+
+def already_online(names):
+    """The devices that are already up and ready, checked before any packet is sent.
+
+    They are not woken at all: a ~0s "boot" would drag the boot-time model
+    down until real boots time out.
+    """
+    up = [n for n, result in monitor.probe_many(names).items() if result.get('online')]
+    services = {n: (get_device(n)['ip_address'], _service_port(n)) for n in up if _service_port(n)}
+    checked = probe_hosts(services, icmp=False) if services else {}
+    return {n for n in up if n not in services or checked[n]['port_open']}
+
+def confirm_wakes(names, progress=_no_progress, started=None):
+    """Wait for freshly woken devices; returns {name: seconds to online, or None}."""
+    started = started or time.monotonic()
+    deadlines = {n: boot_model.timeout(n) for n in names}
+    expected = {n: boot_model.stats(n)['median'] for n in names}
+    pending = set(names)
+    reachable = set()
+    results = {}
+    interval = WAKE_POLL_INITIAL
+    boosted = False
+
+    while pending:
+        elapsed = time.monotonic() - started
+        pinging = [n for n in pending if n not in reachable]
+        if pinging:
+            snapshot = monitor.probe_many(pinging)
+            for n in pinging:
+                if snapshot.get(n, {}).get('online'):
+                    reachable.add(n)
+                    progress('reachable', f"{n} answers after {elapsed:.1f}s")
+
+        ready = [n for n in pending & reachable if not _service_port(n)]
+        services = {n: (get_device(n)['ip_address'], _service_port(n))
+                    for n in pending & reachable if _service_port(n)}
+        if services:
+            checked = probe_hosts(services, icmp=False)
+            ready.extend(n for n in services if checked[n]['port_open'])
+
+        elapsed = time.monotonic() - started
+        for n in ready:
+            pending.discard(n)
+            results[n] = round(elapsed, 1)
+            boot_model.record(n, results[n])
+            wake_duration.observe(elapsed, device=n)
+            wake_results.inc(device=n, result='online')
+        for n in [n for n in pending if elapsed >= deadlines[n]]:
+            pending.discard(n)
+            results[n] = None
+            wake_results.inc(device=n, result='timed_out')
+        if not pending:
+            break
+
+        if len(names) == 1:
+            hint = f", usually ~{expected[names[0]]:.0f}s" if expected[names[0]] else ""
+            progress('waiting', f"Waiting for {names[0]} ({elapsed:.0f}s{hint})")
+        else:
+            progress('waiting', f"{len(names) - len(pending)} of {len(names)} devices online ({elapsed:.0f}s)")
 
-def wake_pc():
-    """Wake the PC device using MAC/IP from config['pc_device']"""
+        # Poll fast again once a device is due to have finished booting
+        if not boosted and any(expected[n] and elapsed >= 0.8 * expected[n] for n in pending):
+            interval = WAKE_POLL_INITIAL
+            boosted = True
+        time.sleep(max(min(interval, min(deadlines[n] for n in pending) - elapsed), 0))
+        interval = min(interval * WAKE_POLL_BACKOFF, WAKE_POLL_MAX)
+
+    return results
+
+def _send_wol_to(name):
+    target = _wol_target(name)
+    system_logger.info(f"Sending WoL packet for {name} to {target['mac_address']}")
+    send_wol_batch([target])
+    return target['mac_address']
+
+def wake_device(name, progress=_no_progress, action='device_wake'):
+    """Send a magic packet to a device and wait until it is ready."""
     try:
-        mac = config['pc_device']['mac_address']
-        ip = config['pc_device']['ip_address']
-        bcast = _broadcast_for_ip(ip)
-        system_logger.info(f"Sending PC WoL packet to {mac} via {bcast}")
-        send_wol(mac, bcast)
-        time.sleep(2)
-        attempts = 0
-        max_attempts = 5
-        while attempts < max_attempts:
-            is_online = check_device_status_ip(ip)
-            if is_online:
-                log_activity('pc_wake_on_lan', 'success', f"PC at {ip} is online after {attempts+1} attempts")
-                return True
-            time.sleep(2)
-            attempts += 1
-        log_activity('pc_wake_on_lan', 'failed', f"PC at {ip} failed to respond after {max_attempts} attempts")
+        if name in already_online([name]):
+            system_logger.info(f"{name} is already online; no WoL packet sent")
+            log_activity(action, 'success', f"{name} already online")
+            wake_results.inc(device=name, result='already_online')
+            progress('online', f"{name} is already online")
+            return True
+
+        started = time.monotonic()
+        mac = _send_wol_to(name)
+        progress('packet_sent', f"Magic packet sent to {mac}")
+
+        seconds = confirm_wakes([name], progress, started)[name]
+        if seconds is not None:
+            system_logger.info(f"{name} is now online after WoL ({seconds}s)")
+            log_activity(action, 'success', f"{name} online after {seconds}s")
+            progress('online', f"{name} online after {seconds}s")
+            return True
+
+        timeout = boot_model.timeout(name)
+        system_logger.warning(f"Failed to wake {name} within {timeout:.0f}s")
+        log_activity(action, 'failed', f"{name} failed to respond within {timeout:.0f}s")
+        progress('timed_out', f"{name} failed to respond within {timeout:.0f}s")
         return False
     except Exception as e:
-        system_logger.error(f"Error sending PC WoL packet: {str(e)}")
-        log_activity('pc_wake_on_lan', 'error', str(e))
+        system_logger.error(f"Error sending WoL packet to {name}: {str(e)}")
+        log_activity(action, 'error', f"{name}: {str(e)}")
+        progress('error', str(e))
         return False
 
-def shutdown_device():
-    """Shutdown the device via SSH"""
-    try:
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+def wake_devices(names, progress=_no_progress):
+    """Wake several devices at once.
+
+    All magic packets go out in one batch, then every poll checks the devices
+    still pending in a single concurrent round.  Returns {name: bool}.
+    """
+    results = {}
+    batch = {}
+    online = already_online(names)
+    for name in online:
+        log_activity('device_wake', 'success', f"{name} already online")
+        wake_results.inc(device=name, result='already_online')
+        results[name] = True
+    for name in [n for n in names if n not in online]:
+        try:
+            batch[name] = _wol_target(name)
+            magic_packet(batch[name]['mac_address'], batch[name]['secureon'])
+        except Exception as e:
+            system_logger.error(f"Error preparing WoL packet for {name}: {str(e)}")
+            log_activity('device_wake', 'error', f"{name}: {str(e)}")
+            batch.pop(name, None)
+            results[name] = False
+    started = time.monotonic()
+    if batch:
+        system_logger.info(f"Sending WoL packets to {', '.join(batch)}")
+        send_wol_batch(batch.values())
+    progress('packet_sent', f"Magic packets sent to {len(batch)} devices"
+             + (f", {len(online)} already online" if online else ""))
+
+    for name, seconds in confirm_wakes(list(batch), progress, started).items():
+        results[name] = seconds is not None
+        if seconds is not None:
+            log_activity('device_wake', 'success', f"{name} online after {seconds}s")
+        else:
+            log_activity('device_wake', 'failed',
+                         f"{name} failed to respond within {boot_model.timeout(name):.0f}s")
+    progress('online' if all(results.values()) else 'timed_out',
+             f"{sum(results.values())}/{len(results)} devices online")
+    return results
 
-        system_logger.info("Attempting SSH connection for shutdown")
-        ssh_config = config['target_device']
+def wake_on_lan(progress=_no_progress):
+    """Send Wake-on-LAN magic packet"""
+    return wake_device('target_device', progress, action='wake_on_lan')
 
-        try:
-            # Load the private key, handling passphrase if necessary
-            key = paramiko.Ed25519Key.from_private_key_file(
-                ssh_config['ssh_key_path'],
-                password=ssh_config['ssh_key_passphrase']
-            )
+def wake_pc(progress=_no_progress):
+    """Wake the PC device using MAC/IP from config['pc_device']"""
+    return wake_device('pc_device', progress, action='pc_wake_on_lan')
+
+# ---------------------------------------------------------------------------
+# SSH session pool — the private key is parsed once per process (a bcrypt KDF
+# when it has a passphrase) and one authenticated transport per managed host
+# is kept open while the host is up, so a remote command only costs a channel
+# open.  Dead transports are replaced transparently on next use.
+# ---------------------------------------------------------------------------
+SSH_CONNECT_TIMEOUT = 5   # seconds
+SSH_KEEPALIVE = 30        # seconds between transport keep-alives
+SSH_COMMAND_TIMEOUT = 10  # seconds
+
+class SSHSessionPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._clients = {}
+        self._host_locks = {}
+
+    def load_key(self, path, passphrase):
+        """Return the Ed25519 key at path, parsing it only when the file changes."""
+        cache_key = (path, os.path.getmtime(path), passphrase)
+        with self._lock:
+            key = self._keys.get(cache_key)
+        if key is None:
+            key = paramiko.Ed25519Key.from_private_key_file(path, password=passphrase)
+            with self._lock:
+                if len(self._keys) >= 8:
+                    self._keys.clear()
+                self._keys[cache_key] = key
             system_logger.info("Key loaded successfully")
+        return key
+
+    def _host_lock(self, name):
+        with self._lock:
+            return self._host_locks.setdefault(name, threading.Lock())
+
+    def _connect(self, name):
+        ssh_config = get_device(name)
+        key = self.load_key(ssh_config['ssh_key_path'], ssh_config.get('ssh_key_passphrase', ''))
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        with ssh_connect_latency.time(device=name):
+            client.connect(
+                ssh_config['ip_address'],
+                port=ssh_config.get('ssh_port', 22),
+                username=ssh_config['ssh_username'],
+                pkey=key,
+                timeout=SSH_CONNECT_TIMEOUT,
+                allow_agent=False,
+                look_for_keys=False
+            )
+        client.get_transport().set_keepalive(SSH_KEEPALIVE)
+        system_logger.info(f"SSH connection to {name} ({ssh_config['ip_address']}) established")
+        return client
+
+    def get_client(self, name):
+        """Return a connected SSHClient for a device, reconnecting if needed."""
+        with self._host_lock(name):
+            client = self._clients.get(name)
+            transport = client.get_transport() if client else None
+            if transport is None or not transport.is_active():
+                if client:
+                    client.close()
+                client = self._connect(name)
+                self._clients[name] = client
+            return client
+
+    def run(self, name, command, timeout=SSH_COMMAND_TIMEOUT, wait=True):
+        """Run command on a device over its pooled transport.
+
+        Returns (exit_status, stdout, stderr), or None when wait is False.
+        A stale transport is dropped and the command retried once.
+        """
+        for attempt in (1, 2):
+            client = self.get_client(name)
+            try:
+                _, stdout, stderr = client.exec_command(command, timeout=timeout)
+                break
+            except (paramiko.SSHException, EOFError, OSError) as e:
+                self.close(name)
+                if attempt == 2:
+                    ssh_commands.inc(device=name, result='error')
+                    raise
+                system_logger.info(f"SSH session to {name} was stale, reconnecting: {str(e)}")
+        if not wait:
+            ssh_commands.inc(device=name, result='sent')
+            return None
+        exit_status = stdout.channel.recv_exit_status()
+        ssh_commands.inc(device=name, result='success' if exit_status == 0 else 'failed')
+        return exit_status, stdout.read().decode(errors='replace'), stderr.read().decode(errors='replace')
+
+    def warm(self, name):
+        """Open a session in the background so the next command skips the handshake."""
+        def connect():
+            try:
+                self.get_client(name)
+            except Exception as e:
+                system_logger.warning(f"Could not pre-open SSH session to {name}: {str(e)}")
+        threading.Thread(target=connect, name=f"ssh-warm-{name}", daemon=True).start()
+
+    def close(self, name):
+        with self._lock:
+            client = self._clients.pop(name, None)
+        if client:
+            client.close()
+
+    def close_all(self):
+        with self._lock:
+            names = list(self._clients)
+        for name in names:
+            self.close(name)
+
+ssh_pool = SSHSessionPool()
+
+def run_remote_command(name, command, timeout=SSH_COMMAND_TIMEOUT, wait=True):
+    """Run a shell command on a configured device over the pooled SSH session."""
+    return ssh_pool.run(name, command, timeout=timeout, wait=wait)
+
+def shutdown_host(name, progress=_no_progress, action='device_shutdown'):
+    """Suspend a device by running its shutdown command over SSH"""
+    try:
+        system_logger.info(f"Attempting SSH connection to {name} for shutdown")
+        progress('connecting', "Opening SSH connection")
+        ssh_config = get_device(name)
+
+        try:
+            # Load the private key (cached), handling passphrase if necessary
+            ssh_pool.load_key(ssh_config['ssh_key_path'], ssh_config.get('ssh_key_passphrase', ''))
         except paramiko.ssh_exception.PasswordRequiredException:
             system_logger.error("SSH key requires a passphrase but none was provided.")
-            log_activity('shutdown', 'error', "SSH key requires a passphrase but none was provided.")
+            log_activity(action, 'error', "SSH key requires a passphrase but none was provided.")
+            progress('error', "SSH key requires a passphrase but none was provided.")
+            shutdown_results.inc(device=name, result='error')
             return False
         except Exception as e:
             system_logger.error(f"Error loading SSH key: {str(e)}")
-            log_activity('shutdown', 'error', f"Error loading SSH key: {str(e)}")
+            log_activity(action, 'error', f"Error loading SSH key: {str(e)}")
+            progress('error', f"Error loading SSH key: {str(e)}")
+            shutdown_results.inc(device=name, result='error')
             return False
 
         try:
-            ssh.connect(
-                ssh_config['ip_address'],
-                port=ssh_config['ssh_port'],
-                username=ssh_config['ssh_username'],
-                pkey=key,  # Use the loaded key instead of key_filename
-                timeout=5
-            )
-            system_logger.info("SSH connection successful")
-
-            # Send shutdown command
-            system_logger.info("Executing shutdown command")
-            ssh.exec_command('systemctl suspend --no-wall')
-            ssh.close()
+            # Send shutdown command; the host suspends, so don't wait for an exit status
+            system_logger.info(f"Executing shutdown command on {name}")
+            command = ssh_config.get('shutdown_command', DEFAULT_SHUTDOWN_COMMAND)
+            run_remote_command(name, command, wait=False)
+            ssh_pool.close(name)
             system_logger.info("Shutdown command executed successfully")
 
             # Update state
-            config['state'] = False
-            save_config(config)
-            log_activity('shutdown', 'success', "Shutdown command sent successfully")
+            if name == 'target_device':
+                config['state'] = False
+                save_config(config)
+            log_activity(action, 'success', f"Shutdown command sent to {name}")
+            progress('command_sent', "Suspend command sent")
+            shutdown_results.inc(device=name, result='success')
             return True
 
         except Exception as connect_err:
-            system_logger.error(f"SSH Connect Error: {str(connect_err)}")
-            log_activity('shutdown', 'error', f"SSH Connect Error: {str(connect_err)}")
+            ssh_pool.close(name)
+            system_logger.error(f"SSH Connect Error ({name}): {str(connect_err)}")
+            log_activity(action, 'error', f"SSH Connect Error: {str(connect_err)}")
+            progress('error', f"SSH Connect Error: {str(connect_err)}")
+            shutdown_results.inc(device=name, result='error')
             return False
     except Exception as e:
-        system_logger.error(f"General SSH Error during shutdown: {str(e)}")
-        log_activity('shutdown', 'error', str(e))
+        system_logger.error(f"General SSH Error during shutdown of {name}: {str(e)}")
+        log_activity(action, 'error', str(e))
+        progress('error', str(e))
+        shutdown_results.inc(device=name, result='error')
         return False
 
-def schedule_off(hours):
-    global off_timer
-    if off_timer:
-        off_timer.cancel()
-        system_logger.info("Cancelled previous scheduled shutdown")
+def shutdown_device(progress=_no_progress):
+    """Shutdown the device via SSH"""
+    return shutdown_host('target_device', progress, action='shutdown')
 
-    def turn_off():
-        system_logger.info(f"Executing scheduled shutdown after {hours} hours")
-        shutdown_device()
-        config['scheduled_off_time'] = None
-        save_config(config)
+def shutdown_devices(names, progress=_no_progress):
+    """Shut down several devices concurrently; returns {name: bool}."""
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(names), 16) or 1) as pool:
+        futures = {name: pool.submit(shutdown_host, name) for name in names}
+        results = {name: f.result() for name, f in futures.items()}
+    progress('command_sent' if all(results.values()) else 'error',
+             f"{sum(results.values())}/{len(results)} devices accepted the shutdown command")
+    return results
+
+# ---------------------------------------------------------------------------
+# Telemetry — while an SSH-managed host is online, one batched command every
+# TELEMETRY_INTERVAL seconds reads its load, uptime, temperatures and
+# logged-in users over the pooled SSH transport (one channel, nothing
+# installed on the host).  The parsed snapshot is cached per device and is
+# an input for idle policies.
+# ---------------------------------------------------------------------------
+TELEMETRY_INTERVAL = 60  # seconds
+TELEMETRY_TIMEOUT = 10  # seconds
+TELEMETRY_STALE_AFTER = 3 * TELEMETRY_INTERVAL
+TELEMETRY_SECTIONS = ('loadavg', 'uptime', 'nproc', 'thermal', 'who')
+TELEMETRY_COMMAND = (
+    "echo '#loadavg'; cat /proc/loadavg; "
+    "echo '#uptime'; cat /proc/uptime; "
+    "echo '#nproc'; nproc; "
+    "echo '#thermal'; for zone in /sys/class/thermal/thermal_zone*; do "
+    "[ -r \"$zone/temp\" ] && echo \"$(cat \"$zone/type\") $(cat \"$zone/temp\")\"; done; "
+    "echo '#who'; who; true"
+)
+
+def parse_telemetry(output):
+    """Parse TELEMETRY_COMMAND output; raises ValueError if /proc/loadavg is missing."""
+    sections = {}
+    current = None
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith('#') and line[1:] in TELEMETRY_SECTIONS:
+            current = sections.setdefault(line[1:], [])
+        elif current is not None and line:
+            current.append(line)
+
+    load = (sections.get('loadavg') or [''])[0].split()
+    if len(load) < 4:
+        raise ValueError(f"Unexpected telemetry output: {output.strip()[:200]!r}")
+    running, processes = load[3].split('/')
+    snapshot = {
+        'load': {'1m': float(load[0]), '5m': float(load[1]), '15m': float(load[2]),
+                 'running': int(running), 'processes': int(processes)},
+        'uptime_seconds': float(sections['uptime'][0].split()[0]) if sections.get('uptime') else None,
+        'cpus': int(sections['nproc'][0]) if sections.get('nproc') else None
+    }
+
+    temperatures = []
+    for line in sections.get('thermal', []):
+        zone, _, value = line.rpartition(' ')
+        if value.lstrip('-').isdigit():
+            temperatures.append({'zone': zone or 'unknown', 'celsius': round(int(value) / 1000, 1)})
+    snapshot['temperatures'] = temperatures
+    snapshot['max_temp_c'] = max((t['celsius'] for t in temperatures), default=None)
+
+    users = []
+    for line in sections.get('who', []):
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        remote = fields[-1] if fields[-1].startswith('(') else None
+        users.append({
+            'user': fields[0],
+            'tty': fields[1],
+            'since': ' '.join(fields[2:-1] if remote else fields[2:]) or None,
+            'from': remote.strip('()') if remote else None
+        })
+    snapshot['users'] = users
+    return snapshot
+
+class TelemetryCollector:
+    def __init__(self, interval=TELEMETRY_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._running = set()
+
+    @staticmethod
+    def enabled(name):
+        device = get_device(name)
+        return bool(device.get('ssh_username')) and device.get('telemetry', True)
+
+    def collect(self, name):
+        """Run the telemetry command on a device now and return its snapshot."""
+        started = time.monotonic()
+        try:
+            _, stdout, _ = ssh_pool.run(name, TELEMETRY_COMMAND, timeout=TELEMETRY_TIMEOUT)
+            data = parse_telemetry(stdout)
+        except Exception as e:
+            system_logger.warning(f"Telemetry from {name} failed: {str(e)}")
+            with self._lock:
+                # Keep the last good readings; they age out via collected_at
+                snapshot = dict(self._snapshots.get(name) or {'name': name, 'collected_at': None})
+                snapshot.update(error=str(e), error_at=time.time())
+                self._snapshots[name] = snapshot
+                return dict(snapshot)
+
+        snapshot = dict(data, name=name, collected_at=time.time(), error=None, error_at=None,
+                        duration_ms=round((time.monotonic() - started) * 1000, 1))
+        with self._lock:
+            self._snapshots[name] = snapshot
+        device_load.set(data['load']['1m'], device=name)
+        device_logins.set(len(data['users']), device=name)
+        history.record(name, 'load1', data['load']['1m'])
+        if data['max_temp_c'] is not None:
+            device_temperature.set(data['max_temp_c'], device=name)
+            history.record(name, 'temp_c', data['max_temp_c'])
+        return dict(snapshot)
+
+    def _collect_in_background(self, name):
+        try:
+            self.collect(name)
+        finally:
+            with self._lock:
+                self._running.discard(name)
+
+    def tick(self):
+        """Monitor hook: start a collection for every online host that is due."""
+        now = time.time()
+        for name in device_names():
+            if not (monitor.get(name) or {}).get('online') or not self.enabled(name):
+                continue
+            if device_busy(name):
+                continue  # don't talk to a host that is being woken or suspended
+            with self._lock:
+                last = self._snapshots.get(name) or {}
+                last_try = max(last.get('collected_at') or 0, last.get('error_at') or 0)
+                if name in self._running or now - last_try < self.interval:
+                    continue
+                self._running.add(name)
+            threading.Thread(target=self._collect_in_background, args=(name,),
+                             name=f"telemetry-{name}", daemon=True).start()
+
+    def get(self, name):
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+            return dict(snapshot) if snapshot else None
+
+    def fresh(self, name):
+        """The snapshot if it is recent and the last attempt succeeded, else None."""
+        snapshot = self.get(name)
+        if not snapshot or snapshot['error'] or not snapshot['collected_at']:
+            return None
+        if time.time() - snapshot['collected_at'] > TELEMETRY_STALE_AFTER:
+            return None
+        return snapshot
+
+telemetry = TelemetryCollector()
+monitor.tick_hooks.append(telemetry.tick)
+
+# ---------------------------------------------------------------------------
+# Background jobs — wake and shutdown run in their own thread so the request
+# returns a job id immediately.  Each job records the phases reported by the
+# worker (packet_sent, waiting, online, timed_out, ...) and is published on
+# the 'job' SSE channel as it progresses.
+#
+# Jobs are also the per-device operation manager: every device has a FIFO
+# queue of unfinished jobs and a job only runs once it is at the head of the
+# queue of each device it touches, so a wake and a shutdown of the same host
+# never overlap.  A request identical to the newest queued or running job on
+# its devices joins that job instead of starting another one.
+# ---------------------------------------------------------------------------
+JOB_RETENTION = 3600  # seconds a finished job stays queryable
+MAX_JOBS = 100
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_jobs_cond = threading.Condition(_jobs_lock)
+_device_queues = {}  # device name -> ids of its unfinished jobs, oldest first
+
+def _job_view(job):
+    view = dict(job)
+    view['phases'] = list(job['phases'])
+    view['devices'] = list(job['devices'])
+    return view
+
+def _prune_jobs():
+    now = time.time()
+    finished = sorted((j for j in _jobs.values() if j['finished_at']),
+                      key=lambda j: j['finished_at'])
+    for job in finished:
+        if now - job['finished_at'] > JOB_RETENTION or len(_jobs) > MAX_JOBS:
+            del _jobs[job['id']]
+
+def _joinable_job(kind, devices):
+    """The newest unfinished job with the same kind and devices, if every device has it queued last."""
+    newest = {_device_queues[d][-1] for d in devices if _device_queues.get(d)}
+    if len(newest) != 1 or not all(_device_queues.get(d) for d in devices):
+        return None
+    job = _jobs[newest.pop()]
+    return job if job['kind'] == kind and job['devices'] == devices else None
+
+def _blocking_job(job):
+    """The first unfinished job ahead of this one on any of its devices, or None."""
+    for device in job['devices']:
+        first = _device_queues[device][0]
+        if first != job['id']:
+            return _jobs[first]
+    return None
+
+def start_job(kind, target, func, devices=None):
+    """Run func(progress) in a background thread and return the job record.
+
+    func reports phases through progress(phase, message) and returns a bool.
+    devices (default: [target]) are the hosts the job operates on; it waits
+    for earlier jobs on them, and an identical unfinished job is returned
+    (with 'coalesced': True) instead of starting a new one.
+    """
+    devices = sorted(set(devices if devices is not None else [target]))
+    job = {
+        'id': uuid.uuid4().hex[:12],
+        'kind': kind,
+        'target': target,
+        'devices': devices,
+        'status': 'queued',
+        'phase': 'queued',
+        'message': None,
+        'phases': [],
+        'success': None,
+        'requests': 1,
+        'created_at': time.time(),
+        'finished_at': None
+    }
+
+    def progress(phase, message=None):
+        with _jobs_lock:
+            job['phase'] = phase
+            job['message'] = message
+            job['phases'].append({'phase': phase, 'message': message, 'at': time.time()})
+            view = _job_view(job)
+        events.publish('job', view)
+
+    def run():
+        with _jobs_cond:
+            blocker = _blocking_job(job)
+        if blocker is not None:
+            progress('queued', f"Waiting for {blocker['kind']} of {blocker['target']} to finish")
+            with _jobs_cond:
+                _jobs_cond.wait_for(lambda: _blocking_job(job) is None)
+        with _jobs_lock:
+            job['status'] = 'running'
+        try:
+            success = bool(func(progress))
+        except Exception as e:
+            system_logger.error(f"Job {job['id']} ({kind}) crashed: {str(e)}")
+            progress('error', str(e))
+            success = False
+        with _jobs_cond:
+            job['success'] = success
+            job['status'] = 'succeeded' if success else 'failed'
+            job['finished_at'] = time.time()
+            for device in devices:
+                _device_queues[device].remove(job['id'])
+                if not _device_queues[device]:
+                    del _device_queues[device]
+            _jobs_cond.notify_all()
+            view = _job_view(job)
+        events.publish('job', view)
+        notify_status()
+
+    # The duplicate check and the insert share one critical section, so two
+    # identical requests arriving together cannot both start a job
+    with _jobs_lock:
+        existing = _joinable_job(kind, devices)
+        if existing is not None:
+            existing['requests'] += 1
+            view = _job_view(existing)
+        else:
+            _prune_jobs()
+            _jobs[job['id']] = job
+            for device in devices:
+                _device_queues.setdefault(device, []).append(job['id'])
+            view = _job_view(job)
+    if existing is not None:
+        system_logger.info(f"Joined {kind} {target} request to job {existing['id']}")
+        view['coalesced'] = True
+        return view
+    threading.Thread(target=run, name=f"job-{kind}-{job['id']}", daemon=True).start()
+    system_logger.info(f"Started job {job['id']} ({kind} {target})")
+    return view
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return _job_view(job) if job else None
+
+def device_busy(name):
+    """Whether a wake or shutdown job is queued or running for the device."""
+    with _jobs_lock:
+        return bool(_device_queues.get(name))
+
+def _turn_on_job(progress):
+    success = wake_on_lan(progress)
+    # Cancel any scheduled shutdown
+    if success:
+        _cancel_scheduled_off('device wake-up')
+    return success
+
+def _turn_off_job(progress):
+    success = shutdown_device(progress)
+    # Cancel any scheduled shutdown
+    _cancel_scheduled_off('manual shutdown')
+    return success
+
+# ---------------------------------------------------------------------------
+# Scheduler — one thread serves every scheduled wake/shutdown from a heap
+# ordered by next run time.  Schedules are one-shot ('run_at') or recurring
+# (5-field cron, local time) and are persisted to SCHEDULES_FILE so they
+# survive a service restart; one-shots missed by less than
+# SCHEDULE_MISFIRE_GRACE while the service was down still run on startup.
+# ---------------------------------------------------------------------------
+SCHEDULES_FILE = 'schedules.json'
+SCHEDULE_MISFIRE_GRACE = 900  # seconds
+SCHEDULE_ACTIONS = ('wake', 'shutdown')
+SCHEDULE_DEFER = 600  # seconds a shutdown is pushed back while Plex is streaming
+SCHEDULE_PLEX_RETRY = 60  # seconds to wait for Plex status that is not known yet
+SCHEDULE_PLEX_UNKNOWN_MAX = 3  # retries before a shutdown runs despite unknown status
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+_CRON_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+def parse_cron(expr):
+    """Parse 'minute hour day-of-month month day-of-week' into sets of values."""
+    parts = expr.split()
+    if len(parts) != 5:
+        raise ValueError("Cron expression needs 5 fields")
+    fields = []
+    for part, (lo, hi) in zip(parts, _CRON_RANGES):
+        values = set()
+        for item in part.split(','):
+            step = 1
+            if '/' in item:
+                item, step = item.split('/', 1)
+                step = int(step)
+            if item == '*':
+                start, end = lo, hi
+            elif '-' in item:
+                start, end = (int(v) for v in item.split('-', 1))
+            else:
+                start = int(item)
+                end = hi if step > 1 else start
+            if step < 1 or start < lo or end > hi or start > end:
+                raise ValueError(f"Invalid cron field '{part}'")
+            values.update(range(start, end + 1, step))
+        fields.append(values)
+    if 7 in fields[4]:
+        fields[4].add(0)  # 7 is also Sunday
+    # Standard cron: if both day fields are restricted, either may match
+    fields.append(parts[2] != '*' and parts[4] != '*')
+    return fields
+
+def cron_next(expr, after):
+    """Return the first datetime strictly after `after` matching the cron expression."""
+    minutes, hours, days, months, weekdays, either_day = parse_cron(expr)
+    t = (after + datetime.timedelta(minutes=1)).replace(second=0, microsecond=0)
+    limit = t + datetime.timedelta(days=366 * 4)
+    while t < limit:
+        if t.month not in months:
+            t = (t.replace(day=1, hour=0, minute=0) + datetime.timedelta(days=32)).replace(day=1)
+            continue
+        day_ok = t.day in days
+        weekday_ok = (t.weekday() + 1) % 7 in weekdays
+        if not ((day_ok or weekday_ok) if either_day else (day_ok and weekday_ok)):
+            t = t.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            continue
+        if t.hour not in hours:
+            t = t.replace(minute=0) + datetime.timedelta(hours=1)
+            continue
+        if t.minute not in minutes:
+            t += datetime.timedelta(minutes=1)
+            continue
+        return t
+    raise ValueError(f"Cron expression '{expr}' never matches")
+
+class Scheduler:
+    def __init__(self, path):
+        self.path = path
+        self._cond = threading.Condition()
+        self._schedules = {}
+        self._heap = []  # (next_run epoch, id); stale entries are skipped
+        self._thread = None
+        self._stop = False
+
+    # -- persistence --------------------------------------------------------
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            system_logger.error(f"Error reading {self.path}: {str(e)}")
+            return
+        now = time.time()
+        with self._cond:
+            for entry in entries:
+                if entry.get('cron'):
+                    # Recurring: resume from now rather than replaying missed runs
+                    entry['next_run'] = self._cron_next_epoch(entry['cron'], now)
+                elif entry['next_run'] < now - SCHEDULE_MISFIRE_GRACE:
+                    system_logger.warning(f"Dropping schedule {entry['id']} missed while stopped "
+                                          f"({entry['action']} {entry['device']} at {entry['run_at']})")
+                    continue
+                self._schedules[entry['id']] = entry
+                heapq.heappush(self._heap, (entry['next_run'], entry['id']))
+            self._save_locked()
+        system_logger.info(f"Loaded {len(self._schedules)} schedules from {self.path}")
+        _sync_scheduled_off_time()
+
+    def _save_locked(self):
+        try:
+            _write_json_atomic(self.path, sorted(self._schedules.values(), key=lambda e: e['next_run']))
+        except Exception as e:
+            system_logger.error(f"Failed to save schedules: {str(e)}")
+
+    # -- public API ---------------------------------------------------------
+    @staticmethod
+    def _cron_next_epoch(expr, after):
+        return cron_next(expr, datetime.datetime.fromtimestamp(after)).timestamp()
+
+    @staticmethod
+    def _view(entry):
+        view = dict(entry)
+        view['next_run'] = datetime.datetime.fromtimestamp(entry['next_run']).strftime(TIME_FORMAT)
+        return view
+
+    def add(self, device, action, run_at=None, cron=None, source='api'):
+        """Add a one-shot (run_at datetime) or recurring (cron) schedule."""
+        if action not in SCHEDULE_ACTIONS:
+            raise ValueError(f"action must be one of {', '.join(SCHEDULE_ACTIONS)}")
+        if device not in device_names():
+            raise ValueError(f"Unknown device '{device}'")
+        if (run_at is None) == (cron is None):
+            raise ValueError("Give exactly one of run_at or cron")
+        entry = {
+            'id': uuid.uuid4().hex[:12],
+            'device': device,
+            'action': action,
+            'run_at': run_at.strftime(TIME_FORMAT) if run_at else None,
+            'cron': cron,
+            'source': source,
+            'enabled': True,
+            'created_at': datetime.datetime.now().strftime(TIME_FORMAT),
+            'last_run': None,
+            'last_job': None
+        }
+        entry['next_run'] = run_at.timestamp() if run_at else self._cron_next_epoch(cron, time.time())
+        with self._cond:
+            self._schedules[entry['id']] = entry
+            heapq.heappush(self._heap, (entry['next_run'], entry['id']))
+            self._save_locked()
+            self._cond.notify()
+        _sync_scheduled_off_time()
+        return self._view(entry)
+
+    def update(self, schedule_id, enabled=None, run_at=None, cron=None):
+        with self._cond:
+            entry = self._schedules.get(schedule_id)
+            if entry is None:
+                return None
+            if enabled is not None:
+                entry['enabled'] = bool(enabled)
+            if run_at is not None:
+                entry['run_at'], entry['cron'] = run_at.strftime(TIME_FORMAT), None
+                entry['next_run'] = run_at.timestamp()
+            elif cron is not None:
+                entry['next_run'] = self._cron_next_epoch(cron, time.time())
+                entry['run_at'], entry['cron'] = None, cron
+            heapq.heappush(self._heap, (entry['next_run'], entry['id']))
+            self._save_locked()
+            self._cond.notify()
+            view = self._view(entry)
+        _sync_scheduled_off_time()
+        return view
+
+    def defer(self, due, seconds, reason, **fields):
+        """Push a due run back; a cron run is deferred as a separate one-shot."""
+        entry = dict(due, **fields)
+        if entry['cron']:
+            entry.update(id=uuid.uuid4().hex[:12], cron=None, source=f"deferred:{due['id']}")
+        run_at = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+        entry['run_at'] = run_at.strftime(TIME_FORMAT)
+        entry['next_run'] = run_at.timestamp()
+        with self._cond:
+            self._schedules[entry['id']] = entry
+            heapq.heappush(self._heap, (entry['next_run'], entry['id']))
+            self._save_locked()
+            self._cond.notify()
+        _sync_scheduled_off_time()
+        system_logger.info(f"Deferred scheduled {due['action']} of {due['device']} to {entry['run_at']}: {reason}")
+        log_activity('schedule', 'deferred',
+                     f"{due['action']} of {due['device']} deferred to {entry['run_at']} ({reason})")
+
+    def cancel(self, schedule_id):
+        with self._cond:
+            entry = self._schedules.pop(schedule_id, None)
+            if entry is not None:
+                self._save_locked()
+        if entry is not None:
+            _sync_scheduled_off_time()
+        return entry is not None
+
+    def cancel_where(self, **match):
+        """Cancel every schedule whose fields equal the given values; returns the count."""
+        with self._cond:
+            ids = [i for i, e in self._schedules.items()
+                   if all(e.get(k) == v for k, v in match.items())]
+            for schedule_id in ids:
+                del self._schedules[schedule_id]
+            if ids:
+                self._save_locked()
+        if ids:
+            _sync_scheduled_off_time()
+        return len(ids)
+
+    def get(self, schedule_id):
+        with self._cond:
+            entry = self._schedules.get(schedule_id)
+            return self._view(entry) if entry else None
+
+    def list(self):
+        with self._cond:
+            entries = sorted(self._schedules.values(), key=lambda e: e['next_run'])
+            return [self._view(e) for e in entries]
+
+    # -- worker -------------------------------------------------------------
+    def _pop_due(self):
+        """Wait for the next due schedule and return a copy of it (None when stopping)."""
+        with self._cond:
+            while not self._stop:
+                while self._heap:
+                    next_run, schedule_id = self._heap[0]
+                    entry = self._schedules.get(schedule_id)
+                    if entry is None or entry['next_run'] != next_run:
+                        heapq.heappop(self._heap)  # cancelled or rescheduled
+                        continue
+                    break
+                timeout = self._heap[0][0] - time.time() if self._heap else None
+                if timeout is not None and timeout <= 0:
+                    _, schedule_id = heapq.heappop(self._heap)
+                    entry = self._schedules[schedule_id]
+                    due = dict(entry)
+                    entry['last_run'] = datetime.datetime.now().strftime(TIME_FORMAT)
+                    if entry['cron']:
+                        entry['next_run'] = self._cron_next_epoch(entry['cron'], time.time())
+                        heapq.heappush(self._heap, (entry['next_run'], schedule_id))
+                    else:
+                        del self._schedules[schedule_id]
+                    self._save_locked()
+                    return due, entry
+                self._cond.wait(timeout)
+        return None, None
+
+    def _run(self):
+        while True:
+            due, entry = self._pop_due()
+            if due is None:
+                return
+            _sync_scheduled_off_time()
+            if not due['enabled']:
+                continue
+            blocker = plex_shutdown_blocker(due['device']) if due['action'] == 'shutdown' else None
+            if blocker == PLEX_STATUS_UNKNOWN:
+                retries = due.get('plex_unknown', 0)
+                if retries < SCHEDULE_PLEX_UNKNOWN_MAX:
+                    self.defer(due, SCHEDULE_PLEX_RETRY, blocker, plex_unknown=retries + 1)
+                    continue
+                # Tautulli down or misconfigured: don't hold the user's shutdown forever
+                system_logger.warning(f"Plex status still unknown after {retries} retries; "
+                                      f"running scheduled shutdown of {due['device']}")
+            elif blocker:
+                self.defer(due, SCHEDULE_DEFER, blocker, plex_unknown=0)
+                continue
+            try:
+                job = run_scheduled_action(due)
+                if job is not None:
+                    with self._cond:
+                        entry['last_job'] = job['id']
+            except Exception as e:
+                system_logger.error(f"Scheduled {due['action']} of {due['device']} failed: {str(e)}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+
+scheduler = Scheduler(SCHEDULES_FILE)
+
+def run_scheduled_action(schedule):
+    """Start the background job for a due schedule; returns the job or None if refused."""
+    device, action = schedule['device'], schedule['action']
+    system_logger.info(f"Executing scheduled {action} of {device} (schedule {schedule['id']})")
+    if action == 'wake':
+        if device_in_restricted_hours(device):
+            log_activity('schedule', 'denied', f"Scheduled wake of {device} skipped during restricted hours")
+            return None
+        if device == 'target_device':
+            return start_job('turn_on', device, _turn_on_job)
+        return start_job('wake', device, lambda progress: wake_device(device, progress))
+    if device == 'target_device':
+        return start_job('turn_off', device, shutdown_device)
+    return start_job('shutdown', device, lambda progress: shutdown_host(device, progress))
+
+def _sync_scheduled_off_time():
+    """Mirror the next one-shot server shutdown into config['scheduled_off_time']."""
+    pending = [e for e in scheduler.list()
+               if e['device'] == 'target_device' and e['action'] == 'shutdown'
+               and not e['cron'] and e['enabled']]
+    scheduled = pending[0]['next_run'] if pending else None
+    if config['scheduled_off_time'] != scheduled:
+        config['scheduled_off_time'] = scheduled
+        notify_status()
+
+def _cancel_scheduled_off(reason):
+    if scheduler.cancel_where(device='target_device', action='shutdown', source='schedule_off'):
+        system_logger.info(f"Cancelled scheduled shutdown after {reason}")
 
-    seconds = hours * 3600
-    off_timer = threading.Timer(seconds, turn_off)
-    off_timer.daemon = True
-    off_timer.start()
+def schedule_off(hours):
+    if scheduler.cancel_where(device='target_device', action='shutdown', source='schedule_off'):
+        system_logger.info("Cancelled previous scheduled shutdown")
 
-    # Save scheduled time
     scheduled_time = datetime.datetime.now() + datetime.timedelta(hours=hours)
-    config['scheduled_off_time'] = scheduled_time.strftime("%Y-%m-%d %H:%M:%S")
-    save_config(config)
+    scheduler.add('target_device', 'shutdown', run_at=scheduled_time, source='schedule_off')
 
     system_logger.info(f"Scheduled shutdown in {hours} hours ({scheduled_time})")
     log_activity('schedule', 'success', f"Scheduled shutdown in {hours} hours")
 
+# ---------------------------------------------------------------------------
+# Idle policies — rules in config['idle_policies'] are evaluated after every
+# monitor round using only data that is already cached (the reachability
+# snapshot and the Plex stream cache), so they add no probes or API calls.
+# A policy fires its action once all of its conditions have held for
+# idle_minutes, e.g.
+#   {"name": "server-idle", "device": "target_device", "idle_minutes": 30,
+#    "conditions": ["no_streams"], "action": "shutdown"}
+# ---------------------------------------------------------------------------
+POLICY_COOLDOWN = 1800  # seconds before the same policy may fire again
+PLEX_STALE_AFTER = 120  # seconds; older stream data counts as unknown
+POLICY_MAX_LOAD = 0.2  # default 'low_load' threshold: 5-minute load per CPU
+POLICY_ACTIONS = ('shutdown',)
+
+PLEX_STATUS_UNKNOWN = "Plex status unknown"
+
+def _plex_host(name):
+    """Whether a device is the Plex/Tautulli server (explicit flag or matching IP)."""
+    device = get_device(name)
+    if 'plex_server' in device:
+        return bool(device['plex_server'])
+    tautulli_ip = config.get('plex', {}).get('tautulli_ip', '').strip()
+    return bool(tautulli_ip) and tautulli_ip == device.get('ip_address')
+
+def plex_shutdown_blocker(name):
+    """Why a shutdown of this device should wait for Plex, or None.
+
+    Unknown stream data (not fetched yet, stale, or Tautulli failing) blocks
+    too; a background fetch is started so a retry can know better.
+    """
+    if not _plex_host(name):
+        return None
+    streams = plex_cache.fresh(PLEX_STALE_AFTER)
+    if streams is None:
+        plex_cache.refresh()
+        return PLEX_STATUS_UNKNOWN
+    return "Plex streams active" if streams else None
+
+def _condition_no_streams(policy):
+    # Unknown (never fetched, stale, or Tautulli failing) is not "idle"
+    streams = plex_cache.fresh(PLEX_STALE_AFTER)
+    plex_cache.get()  # keeps the cache refreshing
+    return streams is not None and not streams
+
+def _condition_online(policy):
+    return bool((monitor.get(policy['device']) or {}).get('online'))
+
+def _condition_no_logins(policy):
+    # No recent telemetry is unknown, not "idle"
+    snapshot = telemetry.fresh(policy['device'])
+    return snapshot is not None and not snapshot['users']
+
+def _condition_low_load(policy):
+    snapshot = telemetry.fresh(policy['device'])
+    if snapshot is None:
+        return False
+    per_cpu = snapshot['load']['5m'] / (snapshot['cpus'] or 1)
+    return per_cpu <= float(policy.get('max_load', POLICY_MAX_LOAD))
+
+# Condition name -> function(policy) returning True when the device looks idle
+POLICY_CONDITIONS = {
+    'no_streams': _condition_no_streams,
+    'online': _condition_online,
+    'no_logins': _condition_no_logins,
+    'low_load': _condition_low_load
+}
+
+def _policy_name(policy):
+    return policy.get('name') or f"{policy['device']}-{policy.get('action', 'shutdown')}"
+
+class IdlePolicyEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle_since = {}
+        self._last_fired = {}
+        self._last_eval = {}
+
+    def policies(self):
+        return [p for p in config.get('idle_policies', []) if p.get('enabled', True)]
+
+    def evaluate(self):
+        now = time.time()
+        for policy in self.policies():
+            name = _policy_name(policy)
+            try:
+                conditions = {c: bool(POLICY_CONDITIONS[c](policy)) for c in policy.get('conditions', [])}
+                # Acting on a device only makes sense while it is up
+                conditions['online'] = _condition_online(policy)
+                # and the Plex host is never suspended during (or unknown) playback
+                if _plex_host(policy['device']):
+                    conditions['no_streams'] = _condition_no_streams(policy)
+            except KeyError as e:
+                system_logger.error(f"Idle policy {name}: unknown condition {str(e)}")
+                continue
+            idle = all(conditions.values())
+            with self._lock:
+                if not idle:
+                    self._idle_since.pop(name, None)
+                    since = None
+                else:
+                    since = self._idle_since.setdefault(name, now)
+                self._last_eval[name] = {'conditions': conditions, 'idle_since': since}
+                due = (since is not None
+                       and now - since >= float(policy.get('idle_minutes', 30)) * 60
+                       and now - self._last_fired.get(name, 0) >= POLICY_COOLDOWN)
+                if policy.get('skip_restricted_hours', True) and check_restricted_hours():
+                    due = False
+                if due:
+                    self._last_fired[name] = now
+                    self._idle_since.pop(name, None)
+            if due:
+                self._fire(name, policy, now - since)
+
+    def _fire(self, name, policy, idle_seconds):
+        device, action = policy['device'], policy.get('action', 'shutdown')
+        system_logger.info(f"Idle policy {name}: {device} idle for {idle_seconds / 60:.0f} min, running {action}")
+        log_activity('idle_policy', 'success', f"{name}: {action} {device} after {idle_seconds / 60:.0f} min idle")
+        if action not in POLICY_ACTIONS:
+            system_logger.error(f"Idle policy {name}: unsupported action '{action}'")
+            return
+        if device == 'target_device':
+            start_job('turn_off', device, _turn_off_job)
+        else:
+            start_job('shutdown', device, lambda progress: shutdown_host(device, progress))
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            result = []
+            for policy in config.get('idle_policies', []):
+                name = _policy_name(policy)
+                state = self._last_eval.get(name, {})
+                since = state.get('idle_since')
+                result.append(dict(policy, name=name,
+                                   conditions_state=state.get('conditions'),
+                                   idle_for=round(now - since) if since else 0,
+                                   last_fired=self._last_fired.get(name)))
+            return result
+
+policy_engine = IdlePolicyEngine()
+monitor.tick_hooks.append(policy_engine.evaluate)
+
+@app.route('/api/policies', methods=['GET'])
+def list_policies():
+    return jsonify(policy_engine.status())
+
+# ---------------------------------------------------------------------------
+# History — compact time series of reachability, RTT and Plex stream counts.
+# The last hour of raw samples lives in in-memory ring buffers; every sample
+# also feeds an open 1-minute and 1-hour bucket, and closed buckets are
+# upserted into SQLite and pruned after a fixed retention, so memory and
+# disk use both stay bounded.
+# ---------------------------------------------------------------------------
+HISTORY_DB_FILE = os.path.join(log_dir, 'history.db')
+HISTORY_RAW_SECONDS = 3600
+HISTORY_RETENTION = {60: 14 * 86400, 3600: 400 * 86400}  # bucket size -> seconds kept
+HISTORY_PRUNE_INTERVAL = 3600
+HISTORY_DEFAULT_RANGE = 86400
+HISTORY_MAX_POINTS = 1000
+PLEX_SERIES = 'plex'
+
+class TimeSeriesRecorder:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._raw = {}   # (series, metric) -> deque of (ts, value)
+        self._open = {}  # (resolution, series, metric) -> [start, count, total, min, max]
+        self._pruned_at = 0
+        self._conn = None
+
+    def open(self):
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._db_lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollups ("
+                "resolution INTEGER NOT NULL, series TEXT NOT NULL, metric TEXT NOT NULL, "
+                "ts INTEGER NOT NULL, count INTEGER NOT NULL, total REAL NOT NULL, "
+                "min REAL NOT NULL, max REAL NOT NULL, "
+                "PRIMARY KEY (resolution, series, metric, ts)) WITHOUT ROWID"
+            )
+
+    def record(self, series, metric, value, now=None):
+        now = now or time.time()
+        closed = []
+        with self._lock:
+            raw = self._raw.setdefault((series, metric), collections.deque())
+            raw.append((now, value))
+            while raw[0][0] < now - HISTORY_RAW_SECONDS:
+                raw.popleft()
+            for resolution in HISTORY_RETENTION:
+                start = int(now // resolution * resolution)
+                key = (resolution, series, metric)
+                bucket = self._open.get(key)
+                if bucket is not None and bucket[0] != start:
+                    closed.append(key + tuple(bucket))
+                    bucket = None
+                if bucket is None:
+                    bucket = self._open[key] = [start, 0, 0.0, value, value]
+                bucket[1] += 1
+                bucket[2] += value
+                bucket[3] = min(bucket[3], value)
+                bucket[4] = max(bucket[4], value)
+        if closed:
+            self._write(closed)
+        if now - self._pruned_at >= HISTORY_PRUNE_INTERVAL:
+            self._prune(now)
+
+    def _write(self, rows):
+        # A bucket reopened after a restart merges with what was flushed before
+        with self._db_lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO rollups (resolution, series, metric, ts, count, total, min, max) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (resolution, series, metric, ts) DO UPDATE SET "
+                "count = count + excluded.count, total = total + excluded.total, "
+                "min = MIN(min, excluded.min), max = MAX(max, excluded.max)", rows)
+
+    def _prune(self, now):
+        self._pruned_at = now
+        with self._db_lock, self._conn:
+            for resolution, keep in HISTORY_RETENTION.items():
+                self._conn.execute("DELETE FROM rollups WHERE resolution = ? AND ts < ?",
+                                   (resolution, now - keep))
+
+    def flush(self):
+        """Write the open buckets, e.g. at shutdown."""
+        with self._lock:
+            rows = [key + tuple(bucket) for key, bucket in self._open.items()]
+            self._open.clear()
+        if rows:
+            self._write(rows)
+
+    def _resolution_for(self, start, step, now):
+        if step < min(HISTORY_RETENTION) and start >= now - HISTORY_RAW_SECONDS:
+            return 0  # raw samples
+        usable = [r for r, keep in sorted(HISTORY_RETENTION.items()) if start >= now - keep]
+        fitting = [r for r in usable if r <= step]
+        if fitting:
+            return fitting[-1]
+        return usable[0] if usable else max(HISTORY_RETENTION)
+
+    def query(self, series, start, end, step):
+        """Downsample series into step-sized points: {metric: [[ts, avg, min, max], ...]}.
+
+        Raw samples serve sub-minute steps within the last hour; otherwise the
+        finest rollup whose retention covers ``start`` is used.
+        """
+        now = time.time()
+        resolution = self._resolution_for(start, step, now)
+        rows = []
+        with self._lock:
+            if resolution == 0:
+                for (s, metric), samples in self._raw.items():
+                    if s == series:
+                        rows.extend((metric, ts, 1, v, v, v) for ts, v in samples if start <= ts < end)
+            else:
+                for (r, s, metric), (ts, count, total, lo, hi) in self._open.items():
+                    if r == resolution and s == series and start - resolution < ts < end:
+                        rows.append((metric, ts, count, total, lo, hi))
+        if resolution:
+            with self._db_lock:
+                rows.extend(self._conn.execute(
+                    "SELECT metric, ts, count, total, min, max FROM rollups "
+                    "WHERE resolution = ? AND series = ? AND ts > ? AND ts < ?",
+                    (resolution, series, start - resolution, end)).fetchall())
+
+        points = {}
+        for metric, ts, count, total, lo, hi in rows:
+            slot = int(max(ts, start) - start) // step * step + int(start)
+            point = points.setdefault(metric, {}).setdefault(slot, [0, 0.0, lo, hi])
+            point[0] += count
+            point[1] += total
+            point[2] = min(point[2], lo)
+            point[3] = max(point[3], hi)
+        series_out = {
+            metric: [[ts, round(p[1] / p[0], 3), p[2], p[3]] for ts, p in sorted(slots.items())]
+            for metric, slots in points.items()
+        }
+        return {'resolution': resolution, 'series': series_out}
+
+history = TimeSeriesRecorder(HISTORY_DB_FILE)
+atexit.register(history.flush)
+
+def record_history():
+    """Monitor tick hook: sample every device and the Plex stream count."""
+    for name, entry in monitor.snapshot().items():
+        ts = entry['checked_at']
+        history.record(name, 'online', 1 if entry['online'] else 0, ts)
+        if entry['rtt_ms'] is not None:
+            history.record(name, 'rtt_ms', entry['rtt_ms'], ts)
+    if config.get('plex', {}).get('tautulli_ip', '').strip():
+        status = plex_cache.status()
+        if status['age'] is not None and status['age'] <= PLEX_STALE_AFTER:
+            history.record(PLEX_SERIES, 'plex_streams', len(plex_cache.get()))
+            load = plex_collector.current
+            if load:
+                for metric in ('transcodes', 'lan_kbps', 'wan_kbps'):
+                    history.record(PLEX_SERIES, f"plex_{metric}", load[metric])
+
+monitor.tick_hooks.append(record_history)
+
+def _parse_history_time(value, default):
+    """Epoch seconds or an ISO 8601 timestamp (local time) -> epoch seconds."""
+    if not value:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    if not math.isfinite(seconds):
+        raise ValueError(f"'{value}' is not a finite time")
+    return seconds
+
+def _parse_step(value):
+    """Step in seconds; accepts a plain number or a suffix of s, m, h or d."""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    value = value.strip().lower()
+    unit = units.get(value[-1:])
+    seconds = float(value[:-1]) * unit if unit else float(value)
+    if not math.isfinite(seconds):
+        raise ValueError(f"'{value}' is not a finite step")
+    return int(seconds)
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """Downsampled online/rtt_ms (or plex_streams) series: device, from, to, step."""
+    name = request.args.get('device', '').strip()
+    if not name:
+        return jsonify({'error': "device is required"}), 400
+    if name != PLEX_SERIES and name not in device_names():
+        return _unknown_device(name)
+    now = time.time()
+    try:
+        end = _parse_history_time(request.args.get('to'), now)
+        start = _parse_history_time(request.args.get('from'), end - HISTORY_DEFAULT_RANGE)
+        step = _parse_step(request.args['step']) if request.args.get('step') else 0
+        if end <= start:
+            return jsonify({'error': "from must be before to"}), 400
+        # Never return more than HISTORY_MAX_POINTS points per series
+        step = max(step, MONITOR_INTERVAL, int(-(-(end - start) // HISTORY_MAX_POINTS)))
+    except (ValueError, OverflowError) as e:
+        return jsonify({'error': f"Invalid history parameter: {str(e)}"}), 400
+
+    result = history.query(name, start, end, step)
+    result.update({'device': name, 'from': start, 'to': end, 'step': step})
+    online = result['series'].get('online')
+    if online:
+        online_hours = sum(p[1] for p in online) * step / 3600
+        result['uptime'] = round(sum(p[1] for p in online) / len(online), 4)
+        device = get_device(name)
+        if 'power_watts' in device:
+            # Rough estimate: full draw while online, standby draw otherwise
+            sampled_hours = len(online) * step / 3600
+            result['energy_wh'] = round(
+                online_hours * device['power_watts']
+                + (sampled_hours - online_hours) * device.get('standby_watts', 0), 1)
+    return jsonify(result)
+
+# Request instrumentation.  Routes are labelled by their URL rule, not the
+# concrete path, so /api/devices/<name>/status is one series.
+sse_clients = metrics.gauge('sse_clients', 'Connected /api/events subscribers.')
+plex_cache_age = metrics.gauge('plex_cache_age_seconds', 'Age of the cached Plex stream list.')
+
+@metrics.add_collector
+def _collect_runtime_gauges():
+    sse_clients.set(events.subscriber_count())
+    age = plex_cache.status()['age']
+    if age is not None:
+        plex_cache_age.set(age)
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.monotonic()
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.pop('request_started', None)
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    if started is not None:
+        http_latency.observe(time.monotonic() - started, method=request.method, endpoint=endpoint)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
     system_logger.info("Web interface accessed")
@@ -420,11 +3095,8 @@ def manifest():
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    # Check the actual device status
-    is_online = check_device_status()
-    if is_online != config['state']:
-        config['state'] = is_online
-        save_config(config)
+    # Read the last monitor result; state changes are persisted by the monitor
+    snapshot = monitor.get('target_device') or {}
 
     # Check if we're in restricted hours
     in_restricted_hours = check_restricted_hours()
@@ -432,7 +3104,9 @@ def get_status():
     return jsonify({
         'state': config['state'],
         'scheduled_off_time': config['scheduled_off_time'],
-        'in_restricted_hours': in_restricted_hours
+        'in_restricted_hours': in_restricted_hours,
+        'rtt_ms': snapshot.get('rtt_ms'),
+        'checked_at': snapshot.get('checked_at')
     })
 
 @app.route('/api/control', methods=['POST'])
@@ -453,30 +3127,13 @@ def control():
                 'message': 'Cannot turn on during restricted hours (2 AM - 7 AM)'
             })
 
-        # Try to wake up the device
-        success = wake_on_lan()
-
-        # Cancel any scheduled off timer
-        global off_timer
-        if off_timer and success:
-            off_timer.cancel()
-            config['scheduled_off_time'] = None
-            save_config(config)
-            system_logger.info("Cancelled scheduled shutdown after device wake-up")
-
-        return jsonify({'success': success, 'state': config['state']})
+        # Wake the device in the background; progress is reported on the job
+        job = start_job('turn_on', 'target_device', _turn_on_job)
+        return jsonify({'success': True, 'job': job, 'state': config['state']}), 202
 
     elif action == 'turn_off':
-        success = shutdown_device()
-
-        # Cancel any scheduled off timer
-        if off_timer:
-            off_timer.cancel()
-            config['scheduled_off_time'] = None
-            save_config(config)
-            system_logger.info("Cancelled scheduled shutdown after manual shutdown")
-
-        return jsonify({'success': success, 'state': config['state']})
+        job = start_job('turn_off', 'target_device', _turn_off_job)
+        return jsonify({'success': True, 'job': job, 'state': config['state']}), 202
 
     elif action == 'schedule_off':
         hours = int(data.get('hours', 1))
@@ -491,15 +3148,190 @@ def control():
 def pc_wake():
     client_ip = request.remote_addr
     system_logger.info(f"PC wake requested from {client_ip}")
-    success = wake_pc()
-    return jsonify({'success': success})
+    job = start_job('pc_wake', 'pc_device', wake_pc)
+    return jsonify({'success': True, 'job': job}), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    with _jobs_lock:
+        jobs = [_job_view(j) for j in _jobs.values()]
+    jobs.sort(key=lambda j: j['created_at'], reverse=True)
+    return jsonify(jobs)
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+def _device_view(name):
+    device = get_device(name)
+    snapshot = monitor.get(name) or {}
+    return {
+        'name': name,
+        'ip_address': device.get('ip_address'),
+        'mac_address': device.get('mac_address'),
+        'groups': device_groups(name),
+        'ssh': bool(device.get('ssh_username')),
+        'online': snapshot.get('online'),
+        'rtt_ms': snapshot.get('rtt_ms'),
+        'checked_at': snapshot.get('checked_at'),
+        'boot_time': boot_model.stats(name)
+    }
+
+def _unknown_device(name):
+    return jsonify({'success': False, 'message': f"Unknown device '{name}'"}), 404
+
+@app.route('/api/devices', methods=['GET'])
+def list_devices():
+    return jsonify([_device_view(name) for name in device_names()])
+
+@app.route('/api/devices/<name>/status', methods=['GET'])
+def device_status(name):
+    if name not in device_names():
+        return _unknown_device(name)
+    if request.args.get('fresh') or monitor.get(name) is None:
+        monitor.refresh(name)
+    return jsonify(_device_view(name))
+
+@app.route('/api/devices/<name>/wake', methods=['POST'])
+def device_wake(name):
+    if name not in device_names():
+        return _unknown_device(name)
+    if device_in_restricted_hours(name):
+        log_activity('device_wake', 'denied', f"{name}: attempted during restricted hours")
+        return jsonify({'success': False, 'message': 'Cannot wake during restricted hours'}), 409
+    system_logger.info(f"Wake of {name} requested from {request.remote_addr}")
+    job = start_job('wake', name, lambda progress: wake_device(name, progress))
+    return jsonify({'success': True, 'job': job}), 202
+
+@app.route('/api/devices/<name>/shutdown', methods=['POST'])
+def device_shutdown(name):
+    if name not in device_names():
+        return _unknown_device(name)
+    if not get_device(name).get('ssh_username'):
+        return jsonify({'success': False, 'message': f"{name} has no SSH credentials"}), 400
+    system_logger.info(f"Shutdown of {name} requested from {request.remote_addr}")
+    job = start_job('shutdown', name, lambda progress: shutdown_host(name, progress))
+    return jsonify({'success': True, 'job': job}), 202
+
+@app.route('/api/devices/<name>/telemetry', methods=['GET'])
+def device_telemetry(name):
+    """Cached load/uptime/temperature/logins snapshot; ?fresh=1 collects it now."""
+    if name not in device_names():
+        return _unknown_device(name)
+    if not get_device(name).get('ssh_username'):
+        return jsonify({'success': False, 'message': f"{name} has no SSH credentials"}), 400
+    online = (monitor.get(name) or {}).get('online')
+    if request.args.get('fresh') and online:
+        snapshot = telemetry.collect(name)
+    else:
+        snapshot = telemetry.get(name) or {'name': name, 'collected_at': None}
+    collected_at = snapshot.get('collected_at')
+    snapshot['age'] = round(time.time() - collected_at, 1) if collected_at else None
+    snapshot['online'] = online
+    return jsonify(snapshot)
+
+@app.route('/api/groups/<group>/status', methods=['GET'])
+def group_status(group):
+    names = devices_in_group(group)
+    if request.args.get('fresh'):
+        # One concurrent probe round for the whole group
+        monitor.probe_many(names)
+    return jsonify([_device_view(name) for name in names])
+
+@app.route('/api/groups/<group>/wake', methods=['POST'])
+def group_wake(group):
+    names = [n for n in devices_in_group(group) if not device_in_restricted_hours(n)]
+    if not names:
+        return jsonify({'success': False, 'message': f"No wakeable devices in group '{group}'"}), 404
+    system_logger.info(f"Wake of group {group} ({', '.join(names)}) requested from {request.remote_addr}")
+    job = start_job('wake', f"group:{group}",
+                    lambda progress: all(wake_devices(names, progress).values()), devices=names)
+    return jsonify({'success': True, 'devices': names, 'job': job}), 202
+
+@app.route('/api/groups/<group>/shutdown', methods=['POST'])
+def group_shutdown(group):
+    names = [n for n in devices_in_group(group) if get_device(n).get('ssh_username')]
+    if not names:
+        return jsonify({'success': False, 'message': f"No SSH-managed devices in group '{group}'"}), 404
+    system_logger.info(f"Shutdown of group {group} ({', '.join(names)}) requested from {request.remote_addr}")
+    job = start_job('shutdown', f"group:{group}",
+                    lambda progress: all(shutdown_devices(names, progress).values()), devices=names)
+    return jsonify({'success': True, 'devices': names, 'job': job}), 202
+
+def _parse_schedule_time(data):
+    """Return the one-shot run time from run_at / in_minutes / in_hours, or None."""
+    if data.get('run_at'):
+        return datetime.datetime.fromisoformat(data['run_at'])
+    if data.get('in_minutes') is not None:
+        return datetime.datetime.now() + datetime.timedelta(minutes=float(data['in_minutes']))
+    if data.get('in_hours') is not None:
+        return datetime.datetime.now() + datetime.timedelta(hours=float(data['in_hours']))
+    return None
+
+@app.route('/api/schedules', methods=['GET'])
+def list_schedules():
+    return jsonify(scheduler.list())
+
+@app.route('/api/schedules', methods=['POST'])
+def create_schedule():
+    data = request.json or {}
+    try:
+        entry = scheduler.add(
+            data.get('device', 'target_device'),
+            data.get('action'),
+            run_at=_parse_schedule_time(data),
+            cron=data.get('cron') or None
+        )
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    log_activity('schedule', 'success',
+                 f"Scheduled {entry['action']} of {entry['device']} ({entry['cron'] or entry['run_at']})")
+    return jsonify(entry), 201
+
+@app.route('/api/schedules/<schedule_id>', methods=['GET'])
+def get_schedule(schedule_id):
+    entry = scheduler.get(schedule_id)
+    if entry is None:
+        return jsonify({'error': 'Unknown schedule'}), 404
+    return jsonify(entry)
+
+@app.route('/api/schedules/<schedule_id>', methods=['PATCH'])
+def update_schedule(schedule_id):
+    data = request.json or {}
+    try:
+        if data.get('cron'):
+            parse_cron(data['cron'])
+        entry = scheduler.update(schedule_id, enabled=data.get('enabled'),
+                                 run_at=_parse_schedule_time(data), cron=data.get('cron') or None)
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if entry is None:
+        return jsonify({'error': 'Unknown schedule'}), 404
+    return jsonify(entry)
+
+@app.route('/api/schedules/<schedule_id>', methods=['DELETE'])
+def delete_schedule(schedule_id):
+    if not scheduler.cancel(schedule_id):
+        return jsonify({'error': 'Unknown schedule'}), 404
+    log_activity('schedule', 'cancelled', f"Cancelled schedule {schedule_id}")
+    return jsonify({'success': True})
 
 @app.route('/api/pc/status', methods=['GET'])
 def pc_status():
     try:
-        ip = config['pc_device']['ip_address']
-        online = check_device_status_ip(ip)
-        return jsonify({'online': online})
+        snapshot = monitor.get('pc_device')
+        if snapshot is None:
+            # Monitor has not probed the PC yet — do a one-off check
+            monitor.refresh('pc_device')
+            snapshot = monitor.get('pc_device') or {}
+        return jsonify({
+            'online': snapshot.get('online', False),
+            'rtt_ms': snapshot.get('rtt_ms'),
+            'checked_at': snapshot.get('checked_at')
+        })
     except Exception as e:
         system_logger.error(f"PC status error: {str(e)}")
         return jsonify({'online': False, 'error': str(e)}), 500
@@ -507,42 +3339,196 @@ def pc_status():
 @app.route('/api/plex/streams', methods=['GET'])
 def plex_streams():
     streams = get_plex_streams()
-    return jsonify(streams)
+    cache = plex_cache.status()
+    response = jsonify(streams)
+    if cache['age'] is not None:
+        response.headers['X-Cache-Age'] = str(cache['age'])
+    if cache['last_error']:
+        response.headers['X-Cache-Error'] = cache['last_error'][:200]
+    return response
+
+@app.route('/api/plex/status', methods=['GET'])
+def plex_status():
+    return jsonify(plex_cache.status())
+
+PLEX_STATS_DEFAULT_RANGE = 7 * 86400
+
+@app.route('/api/plex/stats', methods=['GET'])
+def plex_stats():
+    """Current Plex load, plus session and load aggregates for from/to (default: last 7 days)."""
+    now = time.time()
+    try:
+        end = _parse_history_time(request.args.get('to'), now)
+        start = _parse_history_time(request.args.get('from'), end - PLEX_STATS_DEFAULT_RANGE)
+    except ValueError as e:
+        return jsonify({'error': f"Invalid stats parameter: {str(e)}"}), 400
+    if end <= start:
+        return jsonify({'error': "from must be before to"}), 400
+
+    # One point spanning the whole range: [ts, avg, min, max] per metric
+    load = history.query(PLEX_SERIES, start, end, int(end - start) + 1)['series']
+    period = plex_sessions.stats(start, end)
+    for metric in ('streams', 'transcodes', 'lan_kbps', 'wan_kbps'):
+        point = load.get(f"plex_{metric}")
+        period[f"avg_{metric}"] = point[0][1] if point else None
+        period[f"peak_{metric}"] = point[0][3] if point else None
+    period.update({'from': start, 'to': end})
+    return jsonify({'current': plex_collector.current, 'period': period})
+
+@app.route('/api/events', methods=['GET'])
+def event_stream():
+    """SSE stream of status, pc_status and plex_streams changes."""
+    def generate():
+        q = events.subscribe()
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    item = q.get(timeout=EVENT_HEARTBEAT)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                if item is None:
+                    return  # evicted for falling behind; the client reconnects
+                event, payload = item
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            events.unsubscribe(q)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# ---------------------------------------------------------------------------
+# Log tail reader — reads backwards from the end of a log in fixed-size chunks
+# so returning the last N lines costs O(N), not O(file size).  Rotated files
+# (name.1, name.2, ...) are read as a continuation of the current file, and a
+# (file, before) cursor lets the UI page further back.
+# ---------------------------------------------------------------------------
+LOG_TAIL_CHUNK = 8192  # bytes
+LOG_PAGE_MAX = 1000  # rows/lines per /api/logs or /api/logs/query response
+
+def _tail_file(path, limit, before=None, skip_header=False):
+    """Return ([(offset, line), ...], has_more) for up to limit lines before byte offset before."""
+    if limit <= 0:
+        return [], True
+    with open(path, 'rb') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size if before is None else min(before, size)
+        pos = end
+        buf = b''
+        # One extra newline is needed because the first segment may be partial
+        while pos > 0 and buf.count(b'\n') <= limit:
+            step = min(LOG_TAIL_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+
+    segments = []
+    offset = pos
+    for segment in buf.split(b'\n'):
+        segments.append((offset, segment))
+        offset += len(segment) + 1
+    if segments and segments[-1][1] == b'' and segments[-1][0] == end:
+        segments.pop()  # trailing newline
+    if pos > 0 and segments:
+        segments.pop(0)  # partial line at the start of the window
+    if skip_header and segments and segments[0][0] == 0:
+        segments.pop(0)
+
+    taken = segments[-limit:]
+    lines = [(o, seg.rstrip(b'\r').decode('utf-8', errors='replace')) for o, seg in taken]
+    return lines, pos > 0 or len(segments) > len(taken)
+
+def tail_log(path, limit, file_index=0, before=None, skip_header=False):
+    """Return (lines oldest-first, next cursor or None) across rotated files."""
+    files = _rotated_files(path)
+    collected = []
+    cursor = None
+    while file_index < len(files) and len(collected) < limit:
+        lines, has_more = _tail_file(files[file_index], limit - len(collected), before, skip_header)
+        collected = [line for _, line in lines] + collected
+        if has_more:
+            cursor = (file_index, lines[0][0])
+        else:
+            file_index += 1
+            before = None
+            cursor = (file_index, None) if file_index < len(files) else None
+    return collected, cursor
+
+def _limit_arg(default=100):
+    """The ?limit= page size, clamped to 1..LOG_PAGE_MAX (SQLite treats LIMIT -1 as no limit)."""
+    return max(min(request.args.get('limit', default, type=int), LOG_PAGE_MAX), 1)
+
+def _jsonify_with_cursor(payload, cursor):
+    response = jsonify(payload)
+    if cursor is not None:
+        file_index, before = cursor
+        response.headers['X-Next-File'] = str(file_index)
+        if before is not None:
+            response.headers['X-Next-Before'] = str(before)
+    return response
+
+@app.route('/api/logs/query', methods=['GET'])
+def query_logs():
+    """Filter activity history: action, result, from, to, limit, offset, group_by."""
+    def split(name):
+        value = request.args.get(name, '').strip()
+        return [v for v in value.split(',') if v] if value else None
+
+    group_by = request.args.get('group_by') or None
+    if group_by and group_by not in ACTIVITY_GROUPS:
+        return jsonify({'error': f"group_by must be one of {', '.join(ACTIVITY_GROUPS)}"}), 400
+    limit = _limit_arg()
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    activity_log.flush(ACTIVITY_READ_WAIT)
+    try:
+        return jsonify(event_store.query(
+            actions=split('action'),
+            results=split('result'),
+            start=request.args.get('from') or None,
+            end=request.args.get('to') or None,
+            limit=limit,
+            offset=offset,
+            group_by=group_by
+        ))
+    except Exception as e:
+        system_logger.error(f"Error querying activity logs: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/logs', methods=['GET'])
 def get_logs():
     log_type = request.args.get('type', 'activity')
-    limit = int(request.args.get('limit', 100))
+    limit = _limit_arg()
+    # Pagination cursor from a previous response's X-Next-File/X-Next-Before headers
+    file_index = max(request.args.get('file', 0, type=int), 0)
+    before = request.args.get('before', type=int)
 
     if log_type == 'activity':
-        log_file = os.path.join(log_dir, 'activity.csv')
+        log_file = ACTIVITY_LOG_FILE
+        activity_log.flush(ACTIVITY_READ_WAIT)
         if not os.path.exists(log_file):
             return jsonify([])
 
         logs = []
         try:
-            with open(log_file, 'r') as f:
-                reader = csv.reader(f)
-                headers = next(reader)  # Skip header row
-
-                # Get all rows and take the most recent ones
-                all_rows = list(reader)
-                rows = all_rows[-limit:] if len(all_rows) > limit else all_rows
-
-                for row in rows:
-                    if len(row) >= 4:
-                        logs.append({
-                            'timestamp': row[0],
-                            'action': row[1],
-                            'result': row[2],
-                            'details': row[3]
-                        })
+            lines, cursor = tail_log(log_file, limit, file_index, before, skip_header=True)
+            for row in csv.reader(lines):
+                if len(row) >= 4:
+                    logs.append({
+                        'timestamp': row[0],
+                        'action': row[1],
+                        'result': row[2],
+                        'details': row[3]
+                    })
 
         except Exception as e:
             system_logger.error(f"Error reading activity logs: {str(e)}")
             return jsonify({'error': str(e)})
 
-        return jsonify(logs)
+        return _jsonify_with_cursor(logs, cursor)
 
     elif log_type == 'system':
         log_file = os.path.join(log_dir, 'system.log')
@@ -550,21 +3536,14 @@ def get_logs():
             return jsonify([])
 
         try:
-            with open(log_file, 'r') as f:
-                lines = f.readlines()
-                # Take the most recent lines
-                lines = lines[-limit:] if len(lines) > limit else lines
-                return jsonify(lines)
+            lines, cursor = tail_log(log_file, limit, file_index, before)
+            return _jsonify_with_cursor([line + '\n' for line in lines], cursor)
         except Exception as e:
             system_logger.error(f"Error reading system logs: {str(e)}")
             return jsonify({'error': str(e)})
 
     return jsonify({'error': 'Invalid log type'})
 
-# Log application startup
-system_logger.info("Application starting up")
-log_activity('startup', 'success', "Application initialized")
-
 # ---------------------------------------------------------------------------
 # Suppress noisy 400 logs from TLS scanners hitting the plain-HTTP port.
 # Werkzeug logs these at WARNING level through the standard 'werkzeug' logger;
@@ -584,5 +3563,263 @@ class _TLSScannerFilter(logging.Filter):
 
 logging.getLogger('werkzeug').addFilter(_TLSScannerFilter())
 
+# ---------------------------------------------------------------------------
+# Serving — create_app() is the app factory: it runs init() and starts the background
+# subsystems (reachability monitor, scheduler).  Device state, schedules and
+# jobs live in memory, so the app is served by exactly one process with N
+# request threads; an flock on logs/background.lock refuses a second one.
+# main() is the CLI entry point: waitress by default, gunicorn (one gthread
+# worker) or the Werkzeug development server on request.
+# ---------------------------------------------------------------------------
+BACKGROUND_LOCK_FILE = os.path.join(log_dir, 'background.lock')
+SERVERS = ('waitress', 'gunicorn', 'werkzeug')
+DEFAULT_HOST = '0.0.0.0'
+DEFAULT_PORT = 5000
+DEFAULT_THREADS = 16
+SHUTDOWN_GRACE = 10  # seconds
+_background = {'initialized': False, 'started': False, 'stopped': False, 'lock_file': None}
+_background_lock = threading.Lock()
+
+def init():
+    """Set up logging, load config.json and open the local stores (once).
+
+    Importing app.py does no file I/O; this does, and it logs how long each
+    step took so slow restarts can be traced.
+    """
+    with _background_lock:
+        if _background['initialized']:
+            return
+        _background['initialized'] = True
+        timings = []
+        for label, step in (('logging', _setup_logging),
+                            ('config', _init_config),
+                            ('event store', _init_event_store),
+                            ('activity log', activity_log.start),
+                            ('history', history.open),
+                            ('plex sessions', plex_sessions.open)):
+            started = time.monotonic()
+            step()
+            timings.append(f"{label} {(time.monotonic() - started) * 1000:.0f}ms")
+    total = (time.monotonic() - _import_started) * 1000
+    system_logger.info(f"Startup took {total:.0f}ms: import {_import_seconds * 1000:.0f}ms, "
+                       + ', '.join(timings))
+
+def check_config(path=CONFIG_FILE, schedules_path=SCHEDULES_FILE):
+    """Validate config.json and schedules.json without changing anything.
+
+    Returns (errors, warnings) as lists of messages.
+    """
+    errors, warnings = [], []
+    if not os.path.exists(path):
+        warnings.append(f"{path} does not exist; it will be created with defaults")
+        return errors, warnings
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        return [f"{path}: {str(e)}"], warnings
+
+    devices = {name: data[name] for name in LEGACY_DEVICES if name in data}
+    devices.update(data.get('devices', {}))
+    for name, device in devices.items():
+        try:
+            magic_packet(device.get('mac_address', ''), device.get('secureon_password') or None)
+        except ValueError as e:
+            errors.append(f"{name}: {str(e)}")
+        ip = device.get('ip_address', '').strip()
+        if not ip:
+            warnings.append(f"{name}: no ip_address, status checks are disabled")
+        else:
+            try:
+                ipaddress.ip_address(ip)
+            except ValueError:
+                errors.append(f"{name}: invalid ip_address '{ip}'")
+        for key in ('ssh_port', 'probe_port', 'power_watts', 'standby_watts'):
+            if key in device and not isinstance(device[key], (int, float)):
+                errors.append(f"{name}: {key} must be a number")
+        if device.get('ssh_username'):
+            key_path = device.get('ssh_key_path', '')
+            if not os.path.exists(key_path):
+                errors.append(f"{name}: ssh_key_path '{key_path}' does not exist")
+            else:
+                try:
+                    SSHSessionPool().load_key(key_path, device.get('ssh_key_passphrase', ''))
+                except Exception as e:
+                    errors.append(f"{name}: cannot load SSH key {key_path}: {str(e) or type(e).__name__}")
+
+    hours = data.get('restricted_hours', {})
+    for key in ('start', 'end'):
+        if not isinstance(hours.get(key), int) or not 0 <= hours[key] <= 23:
+            errors.append(f"restricted_hours.{key} must be an hour from 0 to 23")
+
+    plex = data.get('plex', {})
+    if plex.get('tautulli_ip', '').strip() and not plex.get('tautulli_apikey', '').strip():
+        warnings.append("plex: tautulli_ip is set but tautulli_apikey is empty")
+
+    for policy in data.get('idle_policies', []):
+        label = f"idle policy {_policy_name(policy)}" if 'device' in policy else "idle policy"
+        if policy.get('device') not in devices:
+            errors.append(f"{label}: unknown device '{policy.get('device')}'")
+        if policy.get('action', 'shutdown') not in POLICY_ACTIONS:
+            errors.append(f"{label}: action must be one of {', '.join(POLICY_ACTIONS)}")
+        for condition in policy.get('conditions', []):
+            if condition not in POLICY_CONDITIONS:
+                errors.append(f"{label}: unknown condition '{condition}'")
+
+    if os.path.exists(schedules_path):
+        try:
+            with open(schedules_path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            errors.append(f"{schedules_path}: {str(e)}")
+            entries = []
+        for entry in entries:
+            if entry.get('device') not in devices:
+                errors.append(f"schedule {entry.get('id')}: unknown device '{entry.get('device')}'")
+            if entry.get('cron'):
+                try:
+                    parse_cron(entry['cron'])
+                except ValueError as e:
+                    errors.append(f"schedule {entry.get('id')}: {str(e)}")
+    return errors, warnings
+
+def _run_check():
+    errors, warnings = check_config()
+    for message in warnings:
+        print(f"WARNING: {message}")
+    for message in errors:
+        print(f"ERROR: {message}")
+    if errors:
+        return 1
+    print(f"{CONFIG_FILE} OK")
+    return 0
+
+def _acquire_background_lock():
+    if fcntl is None:
+        return True  # no flock on this platform; assume a single process
+    handle = open(BACKGROUND_LOCK_FILE, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _background['lock_file'] = handle
+    return True
+
+def start_background():
+    """Start the monitor and scheduler (once per process).
+
+    Raises RuntimeError when another process already serves this app: a
+    second one would answer from its own, never-updated in-memory state.
+    """
+    init()
+    with _background_lock:
+        if _background['started']:
+            return
+        if not _acquire_background_lock():
+            raise RuntimeError(f"Another process holds {BACKGROUND_LOCK_FILE}; run a single "
+                               f"process and scale with --threads")
+        _background['started'] = True
+    scheduler.load()
+    system_logger.info("Application starting up")
+    log_activity('startup', 'success', "Application initialized")
+    monitor.start()
+    scheduler.start()
+
+def shutdown():
+    """Stop background threads, close SSH sessions and flush config, history and logs."""
+    with _background_lock:
+        if _background['stopped'] or not _background['initialized']:
+            return
+        _background['stopped'] = True
+    system_logger.info(f"Application shutting down (pid {os.getpid()})")
+    if _background['started']:
+        monitor.stop()
+        scheduler.stop()
+        log_activity('shutdown', 'success', "Application stopped")
+    ssh_pool.close_all()
+    flush_config()
+    history.flush()
+    activity_log.close()
+    if _background['lock_file'] is not None:
+        _background['lock_file'].close()
+
+atexit.register(shutdown)
+
+def create_app():
+    """App factory for WSGI servers, e.g. gunicorn 'app:create_app()'."""
+    init()
+    start_background()
+    return app
+
+def _raise_system_exit(signum, frame):
+    # Turn SIGTERM (systemd stop) into a normal exit so shutdown() runs
+    raise SystemExit(0)
+
+def _serve_waitress(args):
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit("waitress is not installed: pip install waitress")
+    create_app()
+    system_logger.info(f"Serving with waitress on {args.host}:{args.port} ({args.threads} threads)")
+    serve(app, host=args.host, port=args.port, threads=args.threads,
+          connection_limit=max(100, args.threads * 8), ident='homelab-power-manager')
+
+def _serve_gunicorn(args):
+    try:
+        import gunicorn  # noqa: F401 - only checking that it is installed
+    except ImportError:
+        raise SystemExit("gunicorn is not installed: pip install gunicorn")
+    # Exec gunicorn so its master does not inherit this process's threads
+    # and open databases; its one worker imports the app and calls create_app().
+    os.execvp(sys.executable, [
+        sys.executable, '-m', 'gunicorn',
+        '--chdir', os.path.dirname(os.path.abspath(__file__)),
+        '--bind', f"{args.host}:{args.port}",
+        '--workers', '1',
+        '--threads', str(args.threads),
+        '--worker-class', 'gthread',
+        '--graceful-timeout', str(SHUTDOWN_GRACE),
+        'app:create_app()'
+    ])
+
+def _serve_werkzeug(args):
+    create_app()
+    system_logger.warning("Serving with the Werkzeug development server")
+    app.run(host=args.host, port=args.port, debug=False, threaded=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Homelab Power Manager web server")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--server', choices=SERVERS,
+                        help="default: waitress if installed, else werkzeug")
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help="request threads; each SSE client holds one")
+    parser.add_argument('--check', action='store_true',
+                        help="validate config.json and schedules.json, then exit")
+    args = parser.parse_args(argv)
+    if args.check:
+        sys.exit(_run_check())
+    if args.server is None:
+        try:
+            import waitress  # noqa: F401
+            args.server = 'waitress'
+        except ImportError:
+            args.server = 'werkzeug'
+
+    signal.signal(signal.SIGTERM, _raise_system_exit)
+    try:
+        {'waitress': _serve_waitress,
+         'gunicorn': _serve_gunicorn,
+         'werkzeug': _serve_werkzeug}[args.server](args)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown()
+
+_import_seconds = time.monotonic() - _import_started
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    main()
@@ -0,0 +1,501 @@
+"""Benchmark harness for the hot paths of app.py.
+
+Runs the Flask app in-process, in a throw-away working directory, against
+local stand-ins: loopback devices (or a stub prober), a paramiko SSH server
+and a fake Tautulli get_activity endpoint with configurable latency and
+failure rate.  Each scenario drives concurrent clients for a fixed time and
+reports p50/p90/p99 latency, throughput, forks per second and disk writes.
+
+    python bench.py                                # all scenarios, JSON on stdout
+    python bench.py --clients 16 --duration 10 --output bench.json
+    python bench.py --scenarios status,plex_streams --compare bench.json
+
+Wake-on-LAN is deliberately not exercised: it broadcasts real magic packets.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import app
+
+SCENARIOS = ('status', 'device_status', 'plex_streams', 'plex_stats', 'pwa_poll', 'logs',
+             'logs_query', 'log_activity', 'save_config', 'ssh_command')
+
+# ---------------------------------------------------------------------------
+# Fakes
+# ---------------------------------------------------------------------------
+class FakeTautulli:
+    """Tautulli API answering get_activity (`streams` sessions) and server_status
+    after `latency` seconds, failing a `fail_rate` share of requests."""
+
+    def __init__(self, streams=3, latency=0.05, fail_rate=0.0):
+        self.streams = streams
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.connections = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like Tautulli's CherryPy server
+
+            def log_message(self, *args):
+                pass
+
+            def setup(self):
+                fake.connections += 1
+                super().setup()
+
+            def do_GET(self):
+                fake.requests += 1
+                time.sleep(fake.latency)
+                if random.random() < fake.fail_rate:
+                    self.send_response(500)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if 'cmd=server_status' in self.path:
+                    data = {'result': 'success', 'connected': True}
+                else:
+                    data = {'stream_count': str(fake.streams), 'sessions': [
+                        {'session_key': str(i), 'media_type': 'episode', 'title': f"Episode {i}",
+                         'grandparent_title': 'Bench Show', 'friendly_name': f"user{i}",
+                         'video_full_resolution': '1080', 'state': 'playing', 'player': 'Bench',
+                         'location': 'lan' if i % 2 else 'wan', 'bandwidth': '8000',
+                         'transcode_decision': 'transcode' if i % 3 == 0 else 'direct play'}
+                        for i in range(fake.streams)]}
+                body = json.dumps({'response': {'result': 'success', 'data': data}}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name='fake-tautulli', daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+class FakeSSHServer:
+    """Accepts any public key and answers every exec request with exit status 0."""
+
+    def __init__(self, latency=0.0):
+        import paramiko
+        self.latency = latency
+        self.commands = 0
+        self._host_key = paramiko.RSAKey.generate(2048)
+        fake = self
+
+        class Interface(paramiko.ServerInterface):
+            def get_allowed_auths(self, username):
+                return 'publickey'
+
+            def check_auth_publickey(self, username, key):
+                return paramiko.AUTH_SUCCESSFUL
+
+            def check_channel_request(self, kind, chanid):
+                return paramiko.OPEN_SUCCEEDED
+
+            def check_channel_exec_request(self, channel, command):
+                def reply():
+                    fake.commands += 1
+                    time.sleep(fake.latency)
+                    channel.sendall(b'ok\n')
+                    channel.send_exit_status(0)
+                    # EOF rather than close: paramiko acknowledges the exec
+                    # request only after this method returns, and a channel
+                    # closed before that fails the client with "Channel closed".
+                    channel.shutdown_write()
+                    threading.Timer(1, channel.close).start()
+                threading.Thread(target=reply, daemon=True).start()
+                return True
+
+        self._interface = Interface
+        self._sock = socket.socket()
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(('127.0.0.1', 0))
+        self._sock.listen(64)
+        self.port = self._sock.getsockname()[1]
+        threading.Thread(target=self._accept, name='fake-ssh', daemon=True).start()
+
+    def _accept(self):
+        import paramiko
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            transport = paramiko.Transport(conn)
+            transport.add_server_key(self._host_key)
+            transport.start_server(server=self._interface())
+
+    def close(self):
+        self._sock.close()
+
+
+def write_client_key(path):
+    """Write an unencrypted OpenSSH Ed25519 key, the format app.py loads."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+    pem = Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.OpenSSH,
+        serialization.NoEncryption())
+    with open(path, 'wb') as f:
+        f.write(pem)
+    os.chmod(path, 0o600)
+
+
+def stub_probe_hosts(targets, timeout=app.PROBE_TIMEOUT, icmp=True):
+    """Stand-in for app.probe_hosts: every host is up with a 0.2 ms RTT."""
+    return {name: {'online': True, 'port_open': bool(port), 'rtt_ms': 0.2, 'method': 'stub'}
+            for name, (ip, port) in targets.items()}
+
+
+def write_config(workdir, args, tautulli, ssh):
+    key_path = os.path.join(workdir, 'id_ed25519')
+    write_client_key(key_path)
+    ssh_device = {'ip_address': '127.0.0.1', 'ssh_port': ssh.port, 'ssh_username': 'bench',
+                  'ssh_key_path': key_path, 'ssh_key_passphrase': '', 'telemetry': False}
+    config = {
+        'restricted_hours': {'start': 2, 'end': 7},
+        'target_device': dict(ssh_device, mac_address='02:00:00:00:00:01'),
+        'pc_device': {'mac_address': '02:00:00:00:00:02', 'ip_address': '127.0.0.1'},
+        'devices': {
+            f"bench{i:02d}": dict(ssh_device, mac_address=f"02:00:00:00:01:{i:02x}",
+                                  groups=['bench'])
+            for i in range(args.devices)
+        },
+        'plex': {'tautulli_ip': '127.0.0.1', 'tautulli_port': tautulli.port,
+                 'tautulli_apikey': 'bench'}
+    }
+    with open(os.path.join(workdir, 'config.json'), 'w') as f:
+        json.dump(config, f, indent=4)
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+_forks = [0]
+
+
+def count_forks():
+    """Count os.fork() and subprocess spawns (e.g. the ping(8) fallback) in this process."""
+    os.register_at_fork(after_in_parent=lambda: _forks.__setitem__(0, _forks[0] + 1))
+    execute_child = subprocess.Popen._execute_child
+
+    def counted(self, *args, **kwargs):
+        _forks[0] += 1
+        return execute_child(self, *args, **kwargs)
+    subprocess.Popen._execute_child = counted
+
+
+def _proc_io():
+    """(bytes written to storage, write syscalls) for this process, or (None, None)."""
+    try:
+        with open('/proc/self/io') as f:
+            fields = dict(line.split(': ') for line in f.read().splitlines())
+        return int(fields['write_bytes']), int(fields['syscw'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+
+def metric_total(name):
+    """Sum of every sample of a metric in app's /metrics output."""
+    total = 0
+    for line in app.metrics.render().splitlines():
+        if line.startswith(name) and line[len(name):len(name) + 1] in (' ', '{'):
+            total += float(line.rsplit(' ', 1)[1])
+    return total
+
+
+def _delta(after, before):
+    return None if after is None or before is None else after - before
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(make_op, clients, duration):
+    """Run make_op()() in `clients` threads for `duration` seconds and summarise."""
+    latencies = []
+    error_samples = []
+    failures = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        op = make_op()
+        local, failed = [], 0
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                op()
+            except Exception as e:
+                failed += 1
+                if len(error_samples) < 5:
+                    error_samples.append(str(e) or type(e).__name__)
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+            failures[0] += failed
+
+    forks_before = _forks[0]
+    written_before, syscw_before = _proc_io()
+    config_writes_before = metric_total('homelab_config_writes_total')
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    written_after, syscw_after = _proc_io()
+    forks = _forks[0] - forks_before
+
+    samples = sorted(latencies)
+    return {
+        'clients': clients,
+        'duration_s': round(elapsed, 3),
+        'requests': len(samples),
+        'errors': failures[0],
+        'error_samples': error_samples,
+        'throughput_rps': round(len(samples) / elapsed, 1),
+        'latency_ms': {p: round(percentile(samples, q) * 1000, 3) if samples else None
+                       for p, q in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))},
+        'forks_per_sec': round(forks / elapsed, 2),
+        'disk_write_bytes': _delta(written_after, written_before),
+        'write_syscalls': _delta(syscw_after, syscw_before),
+        'config_writes': int(metric_total('homelab_config_writes_total') - config_writes_before)
+    }
+
+# ---------------------------------------------------------------------------
+# Scenarios — each returns a factory building one client's operation
+# ---------------------------------------------------------------------------
+def http_get(port, *paths):
+    def make_op():
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+        def op():
+            for path in paths:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    raise RuntimeError(f"GET {path} returned {response.status}")
+        return op
+    return make_op
+
+
+def call(func):
+    return lambda: func
+
+
+def scenario_ops(name, port):
+    if name == 'status':
+        return http_get(port, '/api/status')
+    if name == 'device_status':
+        return http_get(port, '/api/devices/bench00/status')
+    if name == 'plex_streams':
+        return http_get(port, '/api/plex/streams')
+    if name == 'plex_stats':
+        return http_get(port, '/api/plex/stats')
+    if name == 'pwa_poll':
+        # One polling cycle of the PWA when live updates are unavailable
+        return http_get(port, '/api/status', '/api/pc/status', '/api/plex/streams')
+    if name == 'logs':
+        return http_get(port, '/api/logs?type=activity&limit=100')
+    if name == 'logs_query':
+        return http_get(port, '/api/logs/query?action=bench&result=success&limit=50')
+    if name == 'log_activity':
+        return call(lambda: app.log_activity('bench', 'success', 'benchmark row'))
+    if name == 'save_config':
+        counter = iter(range(10 ** 12))
+
+        def save():
+            app.config['bench_counter'] = next(counter)
+            app.save_config(app.config)
+        return call(save)
+    if name == 'ssh_command':
+        return call(lambda: app.run_remote_command('target_device', 'true'))
+    raise ValueError(f"Unknown scenario '{name}'")
+
+
+class SSEClients:
+    """Hold `count` /api/events streams open, as connected PWA tabs would."""
+
+    def __init__(self, port, count):
+        self._conns = []
+        for _ in range(count):
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            conn.request('GET', '/api/events')
+            response = conn.getresponse()
+            threading.Thread(target=self._drain, args=(response,), daemon=True).start()
+            self._conns.append(conn)
+
+    @staticmethod
+    def _drain(response):
+        try:
+            while response.read1(4096):
+                pass
+        except Exception:
+            pass
+
+    def close(self):
+        for conn in self._conns:
+            conn.sock and conn.sock.shutdown(socket.SHUT_RDWR)
+            conn.close()
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+def start_server(kind, threads):
+    if kind == 'waitress':
+        from waitress import create_server
+        server = create_server(app.app, host='127.0.0.1', port=0, threads=threads)
+        threading.Thread(target=server.run, name='bench-server', daemon=True).start()
+        return server.effective_port, server.close
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='bench-server', daemon=True).start()
+    return server.server_port, server.shutdown
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    """Print p50/p99/throughput relative to an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"{'scenario':<14} {'p50 ms':>26} {'p99 ms':>26} {'req/s':>26}", file=sys.stderr)
+    for name, result in results['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if not old:
+            continue
+
+        def cell(new, before):
+            if new is None or before is None:
+                return 'n/a'
+            change = f"{(new - before) / before * 100:+.0f}%" if before else ''
+            return f"{before:g} -> {new:g} {change}"
+        print(f"{name:<14} {cell(result['latency_ms']['p50'], old['latency_ms']['p50']):>26} "
+              f"{cell(result['latency_ms']['p99'], old['latency_ms']['p99']):>26} "
+              f"{cell(result['throughput_rps'], old['throughput_rps']):>26}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--clients', type=int, default=8, help="concurrent clients per scenario")
+    parser.add_argument('--duration', type=float, default=5, help="seconds per scenario")
+    parser.add_argument('--devices', type=int, default=4, help="extra loopback devices")
+    parser.add_argument('--sse', type=int, default=4, help="open /api/events streams during HTTP scenarios")
+    parser.add_argument('--server', choices=('werkzeug', 'waitress'), default='werkzeug')
+    parser.add_argument('--stub-prober', action='store_true',
+                        help="replace the ICMP/TCP prober with an instant stub")
+    parser.add_argument('--tautulli-latency', type=float, default=0.05)
+    parser.add_argument('--tautulli-fail', type=float, default=0.0, help="failure rate, 0..1")
+    parser.add_argument('--streams', type=int, default=3, help="sessions reported by fake Tautulli")
+    parser.add_argument('--ssh-latency', type=float, default=0.0)
+    parser.add_argument('--log-rows', type=int, default=20000, help="activity rows seeded before log scenarios")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--keep', action='store_true', help="keep the temporary working directory")
+    args = parser.parse_args(argv)
+    names = [n for n in args.scenarios.split(',') if n]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    # Resolve paths before moving into the temporary working directory
+    args.output = args.output and os.path.abspath(args.output)
+    args.compare = args.compare and os.path.abspath(args.compare)
+    tautulli = FakeTautulli(args.streams, args.tautulli_latency, args.tautulli_fail)
+    ssh = FakeSSHServer(args.ssh_latency)
+    workdir = tempfile.mkdtemp(prefix='hpm-bench-')
+    write_config(workdir, args, tautulli, ssh)
+    os.chdir(workdir)
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    logging.getLogger('paramiko').setLevel(logging.CRITICAL)
+    count_forks()
+    if args.stub_prober:
+        app.probe_hosts = stub_probe_hosts
+    app.create_app()
+    port, stop_server = start_server(args.server, max(args.clients + args.sse, 8))
+    sse = SSEClients(port, args.sse) if args.sse else None
+
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'keep')},
+        'scenarios': {}
+    }
+    try:
+        if {'logs', 'logs_query'} & set(names):
+            for i in range(args.log_rows):
+                app.log_activity('bench', 'success', f"seed row {i}")
+            app.activity_log.flush()
+        for name in names:
+            print(f"running {name} ...", file=sys.stderr)
+            result = run_scenario(scenario_ops(name, port), args.clients, args.duration)
+            if name == 'log_activity':
+                started = time.monotonic()
+                app.activity_log.flush()
+                result['drain_ms'] = round((time.monotonic() - started) * 1000, 1)
+            elif name == 'save_config':
+                app.flush_config()
+            results['scenarios'][name] = result
+        results['tautulli_requests'] = tautulli.requests
+        results['tautulli_connections'] = tautulli.connections
+        results['ssh_commands'] = ssh.commands
+    finally:
+        if sse:
+            sse.close()
+        stop_server()
+        app.shutdown()
+        tautulli.close()
+        ssh.close()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
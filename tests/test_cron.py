@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from app import cron_next, parse_cron
+
+
+def at(*args):
+    return datetime.datetime(*args)
+
+
+@pytest.mark.parametrize('field, expected', [
+    ('*/15', {0, 15, 30, 45}),
+    ('5/20', {5, 25, 45}),
+    ('1-10/3', {1, 4, 7, 10}),
+    ('1,2,5-6', {1, 2, 5, 6}),
+    ('59', {59}),
+])
+def test_minute_field_forms(field, expected):
+    assert parse_cron(f"{field} * * * *")[0] == expected
+
+
+def test_seven_is_also_sunday():
+    assert parse_cron("0 0 * * 7")[4] == {0, 7}
+    assert parse_cron("0 0 * * 5-7")[4] == {0, 5, 6, 7}
+
+
+def test_day_fields_are_ored_only_when_both_are_restricted():
+    assert parse_cron("0 0 13 * 5")[5] is True
+    assert parse_cron("0 0 13 * *")[5] is False
+    assert parse_cron("0 0 * * 5")[5] is False
+
+
+@pytest.mark.parametrize('expr', [
+    "0 0 * *",         # 4 fields
+    "0 0 * * * *",     # 6 fields
+    "60 * * * *",      # minute out of range
+    "* 24 * * *",      # hour out of range
+    "* * 0 * *",       # day-of-month starts at 1
+    "* * * 13 *",      # month out of range
+    "5-1 * * * *",     # reversed range
+    "*/0 * * * *",     # zero step
+    "a * * * *",
+])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        parse_cron(expr)
+
+
+def test_next_is_strictly_after():
+    assert cron_next("30 7 * * *", at(2026, 10, 16, 7, 30)) == at(2026, 10, 17, 7, 30)
+    assert cron_next("30 7 * * *", at(2026, 10, 16, 7, 29, 59)) == at(2026, 10, 16, 7, 30)
+
+
+def test_weekdays_skip_the_weekend():
+    # 2026-10-16 is a Friday
+    assert cron_next("30 7 * * 1-5", at(2026, 10, 16, 8, 0)) == at(2026, 10, 19, 7, 30)
+
+
+def test_day_of_month_or_day_of_week():
+    # "13th or any Friday": Friday 2026-10-16 comes before Friday 13 November
+    assert cron_next("0 0 13 * 5", at(2026, 10, 14)) == at(2026, 10, 16)
+    assert cron_next("0 0 13 * 5", at(2026, 10, 30, 1)) == at(2026, 11, 6)
+    # Day-of-week unrestricted: only the 13th
+    assert cron_next("0 0 13 * *", at(2026, 10, 14)) == at(2026, 11, 13)
+
+
+def test_month_and_year_rollover():
+    assert cron_next("0 0 1 1 *", at(2026, 12, 31, 23, 59)) == at(2027, 1, 1)
+    assert cron_next("0 6 31 * *", at(2026, 4, 1)) == at(2026, 5, 31, 6, 0)
+
+
+def test_february_29():
+    assert cron_next("0 12 29 2 *", at(2025, 3, 1)) == at(2028, 2, 29, 12, 0)
+
+
+def test_never_matching_expression():
+    with pytest.raises(ValueError):
+        cron_next("0 0 31 2 *", at(2026, 1, 1))
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture(autouse=True)
+def clean_jobs(monkeypatch):
+    monkeypatch.setattr(app, 'notify_status', lambda: None)
+    app._jobs.clear()
+    app._device_queues.clear()
+    yield
+    app._jobs.clear()
+    app._device_queues.clear()
+
+
+def wait_finished(job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = app.get_job(job_id)
+        if job['finished_at']:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def blocking_func(calls, release):
+    def func(progress):
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+        return True
+    return func
+
+
+@pytest.mark.parametrize('attempt', range(20))
+def test_concurrent_identical_requests_start_one_job(attempt):
+    calls = []
+    release = threading.Event()
+    func = blocking_func(calls, release)
+    clients = 8
+    barrier = threading.Barrier(clients)
+    views = []
+
+    def request():
+        barrier.wait()
+        views.append(app.start_job('turn_on', 'target_device', func))
+
+    threads = [threading.Thread(target=request) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    release.set()
+
+    assert len({v['id'] for v in views}) == 1
+    assert sum(1 for v in views if v.get('coalesced')) == clients - 1
+    job = wait_finished(views[0]['id'])
+    assert job['requests'] == clients
+    assert job['success'] is True
+    assert len(calls) == 1
+
+
+def test_jobs_on_one_device_run_in_order():
+    order = []
+    release = threading.Event()
+
+    def first(progress):
+        order.append('first started')
+        release.wait(5)
+        order.append('first done')
+        return True
+
+    def second(progress):
+        order.append('second started')
+        return False
+
+    one = app.start_job('turn_on', 'nas', first)
+    two = app.start_job('shutdown', 'nas', second)
+    assert two['id'] != one['id'] and not two.get('coalesced')
+    time.sleep(0.1)
+    assert app.get_job(two['id'])['status'] == 'queued'
+    assert app.device_busy('nas')
+    release.set()
+
+    assert wait_finished(two['id'])['status'] == 'failed'
+    assert order == ['first started', 'first done', 'second started']
+    assert not app.device_busy('nas')
+
+
+def test_group_job_waits_for_each_device():
+    release = threading.Event()
+    calls = []
+    single = app.start_job('shutdown', 'b', blocking_func(calls, release))
+    group = app.start_job('group_wake', 'all', lambda progress: calls.append('group') or True,
+                          devices=['a', 'b'])
+    time.sleep(0.1)
+    assert calls == [f"job-shutdown-{single['id']}"]
+    assert app.get_job(group['id'])['status'] == 'queued'
+    release.set()
+    assert wait_finished(group['id'])['success'] is True
+    assert calls[-1] == 'group'
+
+
+def test_other_devices_are_not_blocked():
+    release = threading.Event()
+    app.start_job('turn_on', 'a', blocking_func([], release))
+    other = app.start_job('turn_on', 'b', lambda progress: True)
+    try:
+        assert wait_finished(other['id'])['success'] is True
+    finally:
+        release.set()
+
+
+def test_a_finished_job_is_not_joined():
+    done = app.start_job('turn_on', 'a', lambda progress: True)
+    wait_finished(done['id'])
+    again = app.start_job('turn_on', 'a', lambda progress: True)
+    assert again['id'] != done['id'] and not again.get('coalesced')
+    wait_finished(again['id'])
+
+
+def test_crashing_job_fails_and_frees_the_device():
+    def crash(progress):
+        raise RuntimeError('boom')
+
+    job = wait_finished(app.start_job('turn_on', 'a', crash)['id'])
+    assert job['status'] == 'failed'
+    assert job['phase'] == 'error' and job['message'] == 'boom'
+    assert not app.device_busy('a')
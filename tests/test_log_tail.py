@@ -0,0 +1,123 @@
+import pytest
+
+import app
+from app import _tail_file, tail_log
+
+
+def write(path, lines, newline='\n', trailing=True):
+    text = newline.join(lines) + (newline if trailing else '')
+    path.write_bytes(text.encode())
+
+
+def page_through(path, limit, **kwargs):
+    """Read a whole file back to front, limit lines per call; returns the lines in order."""
+    collected = []
+    before = None
+    while True:
+        lines, has_more = _tail_file(path, limit, before, **kwargs)
+        collected = [line for _, line in lines] + collected
+        if not has_more:
+            return collected
+        before = lines[0][0]
+
+
+@pytest.fixture
+def lines():
+    return [f"line {i:03d} " + 'x' * (i % 7) for i in range(50)]
+
+
+@pytest.mark.parametrize('chunk', [1, 2, 5, 8, 13, 64, 8192])
+@pytest.mark.parametrize('limit', [1, 3, 49, 50, 100])
+def test_last_lines_at_any_chunk_boundary(tmp_path, monkeypatch, lines, chunk, limit):
+    monkeypatch.setattr(app, 'LOG_TAIL_CHUNK', chunk)
+    path = tmp_path / 'log'
+    write(path, lines)
+    result, has_more = _tail_file(path, limit)
+    assert [line for _, line in result] == lines[-limit:]
+    assert has_more == (limit < len(lines))
+
+
+@pytest.mark.parametrize('chunk', [1, 7, 8192])
+def test_offsets_point_at_line_starts(tmp_path, monkeypatch, lines, chunk):
+    monkeypatch.setattr(app, 'LOG_TAIL_CHUNK', chunk)
+    path = tmp_path / 'log'
+    write(path, lines)
+    data = path.read_bytes()
+    for offset, line in _tail_file(path, 10)[0]:
+        assert data[offset:].split(b'\n', 1)[0].decode() == line
+
+
+@pytest.mark.parametrize('chunk', [1, 6, 8192])
+@pytest.mark.parametrize('limit', [1, 4, 7])
+def test_paging_with_before_returns_every_line_once(tmp_path, monkeypatch, lines, chunk, limit):
+    monkeypatch.setattr(app, 'LOG_TAIL_CHUNK', chunk)
+    path = tmp_path / 'log'
+    write(path, lines)
+    assert page_through(path, limit) == lines
+
+
+def test_last_line_without_newline_and_crlf(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'LOG_TAIL_CHUNK', 4)
+    path = tmp_path / 'log'
+    write(path, ['a', 'bb', 'ccc'], newline='\r\n', trailing=False)
+    assert [line for _, line in _tail_file(path, 2)[0]] == ['bb', 'ccc']
+
+
+def test_empty_file_and_zero_limit(tmp_path):
+    path = tmp_path / 'log'
+    path.write_bytes(b'')
+    assert _tail_file(path, 10) == ([], False)
+    write(path, ['a'])
+    assert _tail_file(path, 0) == ([], True)
+
+
+@pytest.mark.parametrize('chunk', [1, 5, 8192])
+def test_skip_header(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(app, 'LOG_TAIL_CHUNK', chunk)
+    path = tmp_path / 'activity.csv'
+    write(path, ['Timestamp,Action', 'r1', 'r2', 'r3'])
+    assert [line for _, line in _tail_file(path, 10, skip_header=True)[0]] == ['r1', 'r2', 'r3']
+    assert page_through(path, 2, skip_header=True) == ['r1', 'r2', 'r3']
+
+    write(path, ['Timestamp,Action'])
+    assert _tail_file(path, 10, skip_header=True) == ([], False)
+
+
+@pytest.fixture
+def rotated(tmp_path):
+    """activity.csv and two rotated copies, each starting with the CSV header."""
+    path = tmp_path / 'activity.csv'
+    rows = [f"row {i:02d}" for i in range(12)]
+    write(tmp_path / 'activity.csv.2', ['Timestamp,Action'] + rows[0:4])
+    write(tmp_path / 'activity.csv.1', ['Timestamp,Action'] + rows[4:9])
+    write(path, ['Timestamp,Action'] + rows[9:12])
+    return str(path), rows
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 4, 5, 11, 12, 50])
+def test_tail_log_pages_across_rotated_files(rotated, limit):
+    path, rows = rotated
+    collected = []
+    file_index, before = 0, None
+    while True:
+        lines, cursor = tail_log(path, limit, file_index, before, skip_header=True)
+        assert len(lines) <= limit
+        collected = lines + collected
+        if cursor is None:
+            break
+        file_index, before = cursor
+    assert collected == rows
+
+
+def test_tail_log_first_page_spans_files(rotated):
+    path, rows = rotated
+    lines, cursor = tail_log(path, 5, skip_header=True)
+    assert lines == rows[-5:]
+    assert cursor[0] == 1 and cursor[1] is not None
+
+
+def test_tail_log_without_skip_header_keeps_headers(rotated):
+    path, rows = rotated
+    lines, cursor = tail_log(path, 4)
+    assert lines == ['Timestamp,Action'] + rows[9:12]
+    assert cursor == (1, None)
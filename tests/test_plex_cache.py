@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from app import PlexStreamCache
+
+
+class FakeFetch:
+    """Injected fetch: returns queued results (or raises them), counting calls."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.gate.wait(5)
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def settle(cache, calls, fetch, timeout=2):
+    """Wait until fetch has been called `calls` times and that refresh has finished."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if fetch.calls >= calls and not cache._refreshing:
+            return cache.status()
+        time.sleep(0.005)
+    raise AssertionError("refresh did not finish")
+
+
+def test_concurrent_gets_start_one_refresh():
+    fetch = FakeFetch([{'title': 'Film'}])
+    fetch.gate.clear()
+    cache = PlexStreamCache(fetch, ttl=60)
+    clients = 16
+    barrier = threading.Barrier(clients)
+    seen = []
+
+    def get():
+        barrier.wait()
+        seen.append(cache.get())
+
+    threads = [threading.Thread(target=get) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # Nobody waited for Tautulli: everyone got the (empty) cached list
+    assert seen == [[]] * clients
+    fetch.gate.set()
+    settle(cache, 1, fetch)
+    assert fetch.calls == 1
+    assert cache.get() == [{'title': 'Film'}]
+    assert fetch.calls == 1  # still within ttl
+
+
+def test_failures_keep_stale_streams_and_back_off():
+    fetch = FakeFetch([{'title': 'Film'}], RuntimeError('connection refused'))
+    cache = PlexStreamCache(fetch, ttl=10, backoff_max=35)
+    cache.get()
+    status = settle(cache, 1, fetch)
+    assert status['failures'] == 0 and status['last_error'] is None
+    assert 9 <= status['next_refresh_in'] <= 10
+
+    waits = []
+    for n in range(2, 6):
+        cache.refresh()
+        status = settle(cache, n, fetch)
+        assert cache.get() == [{'title': 'Film'}]  # stale data is kept
+        assert status['last_error'] == 'connection refused'
+        waits.append(status['next_refresh_in'])
+    assert [round(w) for w in waits] == [20, 35, 35, 35]  # 10 * 2^n, capped
+    assert cache.status()['failures'] == 4
+    assert cache.fresh(60) is None  # erroring data is not trusted
+
+    # Within the back-off window get() does not hit Tautulli again
+    cache.get()
+    assert fetch.calls == 5
+
+
+def test_recovery_clears_the_error():
+    fetch = FakeFetch(RuntimeError('bad api key'), [])
+    cache = PlexStreamCache(fetch, ttl=10)
+    cache.get()
+    status = settle(cache, 1, fetch)
+    assert status['last_error'] == 'bad api key'
+    assert status['age'] is None
+    assert cache.fresh(60) is None
+
+    cache.refresh()
+    status = settle(cache, 2, fetch)
+    assert status['last_error'] is None and status['failures'] == 0
+    assert status['age'] is not None
+    assert cache.fresh(60) == []
+
+
+def test_refresh_is_single_flight():
+    fetch = FakeFetch([])
+    fetch.gate.clear()
+    cache = PlexStreamCache(fetch, ttl=10)
+    cache.get()
+    for _ in range(5):
+        cache.refresh()
+        cache.get()
+    fetch.gate.set()
+    settle(cache, 1, fetch)
+    assert fetch.calls == 1
+
+
+@pytest.mark.parametrize('max_age, fresh', [(60, True), (0, False)])
+def test_fresh_respects_max_age(max_age, fresh):
+    fetch = FakeFetch([{'title': 'Film'}])
+    cache = PlexStreamCache(fetch, ttl=10)
+    cache.get()
+    settle(cache, 1, fetch)
+    time.sleep(0.01)
+    assert (cache.fresh(max_age) is not None) == fresh
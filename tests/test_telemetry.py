@@ -0,0 +1,75 @@
+import pytest
+
+from app import parse_telemetry
+
+OUTPUT = """\
+Welcome to Ubuntu 24.04 LTS
+#loadavg
+0.52 0.40 0.31 3/412 98231
+#uptime
+86523.17 340112.50
+#nproc
+4
+#thermal
+acpitz 27800
+x86_pkg_temp 54000
+iwlwifi_1 -40000
+broken_zone N/A
+#who
+eduard   pts/0        2026-10-17 09:12 (192.168.1.20)
+eduard   tty1         2026-10-17 08:01
+root     pts/1        Oct 17 10:03 (tmux(1234).%0)
+"""
+
+
+def test_full_output():
+    snapshot = parse_telemetry(OUTPUT)
+    assert snapshot['load'] == {'1m': 0.52, '5m': 0.40, '15m': 0.31, 'running': 3, 'processes': 412}
+    assert snapshot['uptime_seconds'] == 86523.17
+    assert snapshot['cpus'] == 4
+    assert snapshot['temperatures'] == [
+        {'zone': 'acpitz', 'celsius': 27.8},
+        {'zone': 'x86_pkg_temp', 'celsius': 54.0},
+        {'zone': 'iwlwifi_1', 'celsius': -40.0},
+    ]
+    assert snapshot['max_temp_c'] == 54.0
+
+
+def test_who_lines_with_and_without_host():
+    users = parse_telemetry(OUTPUT)['users']
+    assert users == [
+        {'user': 'eduard', 'tty': 'pts/0', 'since': '2026-10-17 09:12', 'from': '192.168.1.20'},
+        {'user': 'eduard', 'tty': 'tty1', 'since': '2026-10-17 08:01', 'from': None},
+        {'user': 'root', 'tty': 'pts/1', 'since': 'Oct 17 10:03', 'from': 'tmux(1234).%0'},
+    ]
+
+
+def test_minimal_host_without_sensors_or_logins():
+    snapshot = parse_telemetry("#loadavg\n0.00 0.01 0.05 1/80 12\n#uptime\n#nproc\n#thermal\n#who\n")
+    assert snapshot['load']['5m'] == 0.01
+    assert snapshot['uptime_seconds'] is None
+    assert snapshot['cpus'] is None
+    assert snapshot['temperatures'] == []
+    assert snapshot['max_temp_c'] is None
+    assert snapshot['users'] == []
+
+
+def test_short_who_lines_are_skipped():
+    users = parse_telemetry("#loadavg\n1 1 1 1/1 1\n#who\nlonely\nbob pts/2\n")['users']
+    assert users == [{'user': 'bob', 'tty': 'pts/2', 'since': None, 'from': None}]
+
+
+def test_unknown_markers_are_ordinary_lines():
+    snapshot = parse_telemetry("#loadavg\n1 2 3 1/9 1\n#who\n#comment pts/0 now\n")
+    assert snapshot['users'][0]['user'] == '#comment'
+
+
+@pytest.mark.parametrize('output', [
+    "",
+    "sh: 1: cat: not found\n",
+    "#loadavg\n#uptime\n100.0 50.0\n",
+    "#loadavg\n0.1 0.2\n",
+])
+def test_missing_loadavg_is_an_error(output):
+    with pytest.raises(ValueError):
+        parse_telemetry(output)
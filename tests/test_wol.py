@@ -0,0 +1,165 @@
+import ipaddress
+import socket
+
+import pytest
+
+import app
+from app import _wol_routes, magic_packet, send_wol_batch
+
+MAC = '02:11:22:33:44:55'
+LIMITED = ('', '255.255.255.255')
+
+
+def test_magic_packet_layout():
+    packet = magic_packet(MAC)
+    assert len(packet) == 102
+    assert packet[:6] == b'\xff' * 6
+    assert packet[6:] == bytes.fromhex('021122334455') * 16
+    assert magic_packet('02-11-22-33-44-55') == packet
+    assert magic_packet('021122334455') == packet
+
+
+@pytest.mark.parametrize('password, suffix', [
+    ('192.168.1.1', bytes([192, 168, 1, 1])),
+    ('aa:bb:cc:dd:ee:ff', bytes.fromhex('aabbccddeeff')),
+    ('AA-BB-CC-DD-EE-FF', bytes.fromhex('aabbccddeeff')),
+    ('a1b2c3d4', bytes.fromhex('a1b2c3d4')),
+])
+def test_secureon_passwords(password, suffix):
+    packet = magic_packet(MAC, password)
+    assert packet == magic_packet(MAC) + suffix
+
+
+@pytest.mark.parametrize('password', [
+    'aa:bb:cc:dd:ee',      # 5 bytes
+    '1.2.3',               # 3 bytes
+    '1.2.3.4.5',           # 5 bytes
+    '1.2.3.256',           # not a byte
+    'zz:zz:zz:zz:zz:zz',   # not hex
+])
+def test_invalid_secureon_passwords(password):
+    with pytest.raises(ValueError):
+        magic_packet(MAC, password)
+
+
+@pytest.mark.parametrize('mac', ['02:11:22:33:44', '02:11:22:33:44:55:66', 'not a mac'])
+def test_invalid_mac(mac):
+    with pytest.raises(ValueError):
+        magic_packet(mac)
+
+
+@pytest.fixture
+def interfaces(monkeypatch):
+    def use(*specs):
+        ifaces = [(f"eth{i}", ipaddress.IPv4Interface(spec)) for i, spec in enumerate(specs)]
+        monkeypatch.setattr(app, 'local_ipv4_interfaces', lambda: ifaces)
+    return use
+
+
+def test_directed_broadcast_uses_the_interface_netmask(interfaces):
+    interfaces('192.168.4.10/22', '10.0.0.2/8')
+    assert _wol_routes('192.168.5.20') == {LIMITED, ('192.168.4.10', '192.168.7.255')}
+
+
+def test_target_on_several_interfaces(interfaces):
+    interfaces('172.16.0.5/16', '172.16.1.5/24')
+    assert _wol_routes('172.16.1.9') == {
+        LIMITED, ('172.16.0.5', '172.16.255.255'), ('172.16.1.5', '172.16.1.255')}
+
+
+def test_off_subnet_target_falls_back_to_a_24(interfaces):
+    interfaces('192.168.4.10/22')
+    assert _wol_routes('10.1.2.3') == {LIMITED, ('', '10.1.2.255')}
+
+
+def test_point_to_point_links_are_not_broadcast_domains(interfaces):
+    interfaces('10.9.0.1/31')
+    assert _wol_routes('10.9.0.0') == {LIMITED, ('', '10.9.0.255')}
+
+
+def test_no_ip_means_limited_broadcast_only(interfaces):
+    interfaces('192.168.4.10/22')
+    assert _wol_routes(None) == {LIMITED}
+    assert _wol_routes('') == {LIMITED}
+
+
+def listen(port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', port))
+    sock.settimeout(0.5)
+    return sock
+
+
+def receive_all(sock):
+    packets = []
+    try:
+        while True:
+            packets.append(sock.recv(1024))
+    except socket.timeout:
+        return packets
+
+
+def free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def no_interfaces(monkeypatch):
+    monkeypatch.setattr(app, 'local_ipv4_interfaces', lambda: [])
+
+
+def test_retransmits_reach_a_local_listener(no_interfaces):
+    port = free_udp_port()
+    sock = listen(port)
+    try:
+        sent = send_wol_batch([{'mac_address': MAC, 'broadcast': '127.0.0.1', 'ports': [port],
+                                'secureon': '1.2.3.4'}], schedule=(0, 0.01, 0.02))
+        packets = receive_all(sock)
+    finally:
+        sock.close()
+    assert packets == [magic_packet(MAC, '1.2.3.4')] * 3
+    assert sent >= 3
+
+
+def test_retransmits_on_ports_9_and_7(no_interfaces):
+    try:
+        socks = {port: listen(port) for port in (9, 7)}
+    except OSError as e:
+        pytest.skip(f"cannot bind privileged UDP ports: {e}")
+    try:
+        send_wol_batch([{'mac_address': MAC, 'broadcast': '127.0.0.1', 'ports': [9, 7]}])
+        received = {port: receive_all(sock) for port, sock in socks.items()}
+    finally:
+        for sock in socks.values():
+            sock.close()
+    expected = [magic_packet(MAC)] * len(app.WOL_RETRANSMIT_SCHEDULE)
+    assert received == {9: expected, 7: expected}
+
+
+def test_batch_sends_every_target(no_interfaces):
+    port = free_udp_port()
+    sock = listen(port)
+    other = '02:aa:bb:cc:dd:ee'
+    try:
+        send_wol_batch([{'mac_address': MAC, 'broadcast': '127.0.0.1', 'ports': [port]},
+                        {'mac_address': other, 'broadcast': '127.0.0.1', 'ports': [port]}],
+                       schedule=(0, 0.01))
+        packets = receive_all(sock)
+    finally:
+        sock.close()
+    assert sorted(packets) == sorted([magic_packet(MAC), magic_packet(other)] * 2)
+
+
+def test_invalid_target_sends_nothing(no_interfaces):
+    port = free_udp_port()
+    sock = listen(port)
+    try:
+        with pytest.raises(ValueError):
+            send_wol_batch([{'mac_address': MAC, 'broadcast': '127.0.0.1', 'ports': [port]},
+                            {'mac_address': 'bad', 'broadcast': '127.0.0.1', 'ports': [port]}])
+        packets = receive_all(sock)
+    finally:
+        sock.close()
+    assert packets == []